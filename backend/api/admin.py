@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from api.pagination import CachedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без точного COUNT(*) по всей таблице на каждой странице"""
+
+    paginator = CachedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,235 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.storage import default_storage
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+from django.http import HttpResponse, HttpResponseNotAllowed
+from rest_framework.authtoken.models import Token
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from users.models import User, Follow
+from recipes.models import Recipe, Ingredient
+from api.catalog import catalog_response, render_catalog
+from api.filters import filter_by_ingredients
+from api.pagination import CustomPageNumberPagination
+from api.recipe_cache import get_recipe_payloads, personalize
+from api.relations import ViewerRelations
+from api.renderers import FastJSONRenderer
+from api.views import RecipeViewSet
+
+
+async def get_user_id(request):
+    """Аутентификация по токену без обращения к синхронному ORM.
+
+    Пользователь токена загружается тем же запросом и, как в DRF,
+    записывается в request.user для middleware.
+    """
+    header = request.headers.get("Authorization", "")
+    keyword, _, key = header.partition(" ")
+    if keyword != "Token" or not key:
+        return None
+    try:
+        token = await Token.objects.select_related("user").aget(
+            key=key.strip())
+    except Token.DoesNotExist:
+        return None
+    if not token.user.is_active:
+        return None
+    request.user = token.user
+    return token.user_id
+
+
+def json_response(data, status=200):
+    return HttpResponse(FastJSONRenderer().render(data), status=status,
+                        content_type="application/json")
+
+
+def media_url(request, name):
+    if not name:
+        return None
+    return request.build_absolute_uri(default_storage.url(name))
+
+
+def page_params(request):
+    """Номер страницы и её размер по правилам CustomPageNumberPagination"""
+    paginator = CustomPageNumberPagination
+    try:
+        page = max(int(request.GET.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+    try:
+        size = int(request.GET.get(paginator.page_size_query_param))
+        size = min(max(size, 1), paginator.max_page_size)
+    except (TypeError, ValueError):
+        size = paginator.page_size
+    return page, size
+
+
+def paginated(request, count, page, size, results):
+    url = request.build_absolute_uri()
+    next_url = previous_url = None
+    if page * size < count:
+        next_url = replace_query_param(url, "page", page + 1)
+    if page > 1:
+        previous_url = (replace_query_param(url, "page", page - 1)
+                        if page > 2 else remove_query_param(url, "page"))
+    return {"count": count, "count_exact": True, "next": next_url,
+            "previous": previous_url, "results": results}
+
+
+def recipe_details(request, user_id, recipe_ids):
+    """Карточки рецептов из общего кэша с полями пользователя user_id"""
+    user = User(pk=user_id) if user_id is not None else AnonymousUser()
+    payloads = get_recipe_payloads(recipe_ids)
+    return personalize([payloads[pk] for pk in recipe_ids if pk in payloads],
+                       request, ViewerRelations(user))
+
+
+async def recipe_list(request):
+    """Список рецептов с фильтрами RecipeFilter"""
+    user_id = await get_user_id(request)
+    queryset = Recipe.objects.order_by("-date_created", "-id")
+
+    if author := request.GET.get("author"):
+        if not author.isdigit():
+            return json_response(
+                {"author": ["Введите число."]}, status=400)
+        queryset = queryset.filter(author_id=author)
+    if request.GET.get("is_favorited") in ("1", "true", "True"):
+        if user_id is None:
+            queryset = queryset.none()
+        else:
+            queryset = queryset.filter(in_favorites__user_id=user_id)
+    if request.GET.get("is_in_shopping_cart") in ("1", "true", "True"):
+        if user_id is not None:
+            queryset = queryset.filter(in_shopping_carts__user_id=user_id)
+    if search := request.GET.get("search"):
+        queryset = queryset.filter(title__icontains=search)
+    if request.GET.get("ordering") == "popular":
+        queryset = queryset.order_by("-popularity", "-id")
+    if ingredients := request.GET.get("ingredients"):
+        queryset = filter_by_ingredients(queryset, ingredients,
+                                         request.GET.get("match", "all"))
+
+    page, size = page_params(request)
+    count = await queryset.acount()
+    offset = (page - 1) * size
+    if page > 1 and offset >= count:
+        return json_response({"detail": "Неверная страница."}, status=404)
+
+    recipe_ids = [pk async for pk in
+                  queryset.values_list("id", flat=True)[offset:offset + size]
+                  .aiterator()]
+    results = await sync_to_async(recipe_details)(request, user_id,
+                                                  recipe_ids)
+    return json_response(paginated(request, count, page, size, results))
+
+
+async def recipe_detail(request, pk):
+    """Один рецепт в формате RecipeDetailsSerializer"""
+    user_id = await get_user_id(request)
+    results = await sync_to_async(recipe_details)(request, user_id, [pk])
+    if not results:
+        return json_response({"detail": "Страница не найдена."}, status=404)
+    return json_response(results[0])
+
+
+async def ingredient_list(request):
+    """Поиск ингредиентов по началу названия"""
+    queryset = Ingredient.objects.values("id", "name", "measurement_unit")
+    if not request.GET:
+        return await sync_to_async(catalog_response)(request,
+                                                     render_catalog)
+    if name := request.GET.get("name"):
+        queryset = queryset.filter(name__istartswith=name)
+    return json_response([item async for item in queryset.aiterator()])
+
+
+async def subscriptions(request):
+    """Подписки текущего пользователя с рецептами авторов"""
+    user_id = await get_user_id(request)
+    if user_id is None:
+        return json_response(
+            {"detail": "Учетные данные не были предоставлены."}, status=401)
+
+    queryset = Follow.objects.filter(user_id=user_id).order_by("id")
+    page, size = page_params(request)
+    count = await queryset.acount()
+    offset = (page - 1) * size
+    follows = [
+        follow async for follow in queryset.annotate(
+            recipes_count=Count("author__recipes"),
+        ).values(
+            "author_id", "author__email", "author__username",
+            "author__first_name", "author__last_name", "author__avatar",
+            "recipes_count",
+        )[offset:offset + size].aiterator()
+    ]
+
+    author_ids = [follow["author_id"] for follow in follows]
+    recipes = {author_id: [] for author_id in author_ids}
+    recipes_queryset = Recipe.objects.filter(
+        author_id__in=author_ids
+    ).annotate(
+        position=Window(RowNumber(), partition_by=F("author_id"),
+                        order_by=F("date_created").desc()),
+    ).order_by("author_id", "-date_created")
+    limit = request.GET.get("recipes_limit", "")
+    if limit.isdigit():
+        recipes_queryset = recipes_queryset.filter(position__lte=int(limit))
+    async for recipe in recipes_queryset.values(
+        "id", "author_id", "title", "image", "preparation_time"
+    ).aiterator():
+        recipes[recipe["author_id"]].append({
+            "id": recipe["id"],
+            "name": recipe["title"],
+            "image": media_url(request, recipe["image"]),
+            "cooking_time": recipe["preparation_time"],
+        })
+
+    results = [
+        {
+            "id": follow["author_id"],
+            "email": follow["author__email"],
+            "username": follow["author__username"],
+            "first_name": follow["author__first_name"],
+            "last_name": follow["author__last_name"],
+            "avatar": media_url(request, follow["author__avatar"]),
+            "is_subscribed": True,
+            "recipes": recipes[follow["author_id"]],
+            "recipes_count": follow["recipes_count"],
+        }
+        for follow in follows
+    ]
+    return json_response(paginated(request, count, page, size, results))
+
+
+def with_sync_fallback(async_view, sync_view=None):
+    """GET обслуживается асинхронно, остальные методы - синхронным view"""
+    sync_view = sync_to_async(sync_view) if sync_view else None
+
+    async def view(request, *args, **kwargs):
+        if request.method in ("GET", "HEAD"):
+            return await async_view(request, *args, **kwargs)
+        if sync_view is None:
+            return HttpResponseNotAllowed(["GET", "HEAD"])
+        return await sync_view(request, *args, **kwargs)
+
+    # csrf_exempt в Django 4.2 оборачивает view в синхронную функцию
+    view.csrf_exempt = True
+    return view
+
+
+recipe_list_view = with_sync_fallback(
+    recipe_list, RecipeViewSet.as_view({"get": "list", "post": "create"})
+)
+recipe_detail_view = with_sync_fallback(
+    recipe_detail,
+    RecipeViewSet.as_view({
+        "get": "retrieve",
+        "put": "update",
+        "patch": "partial_update",
+        "delete": "destroy",
+    }),
+)
+ingredient_list_view = with_sync_fallback(ingredient_list)
+subscriptions_view = with_sync_fallback(subscriptions)
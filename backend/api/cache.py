@@ -0,0 +1,230 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from api.metrics import CACHE_EVENTS
+from api.timing import timed_cache_method
+
+
+MISSING = object()
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class LRUStore:
+    """Ограниченный LRU-кэш процесса со счётчиками попаданий"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = dict.fromkeys(
+            ("l1_hits", "l1_misses", "l1_evictions", "l2_hits", "l2_misses"),
+            0,
+        )
+
+    def get(self, key):
+        pickled = None
+        with self.lock:
+            item = self.data.get(key)
+            if item is not None:
+                expires, value = item
+                if expires > time.monotonic():
+                    self.data.move_to_end(key)
+                    pickled = value
+                else:
+                    del self.data[key]
+        self.count("l1_misses" if pickled is None else "l1_hits")
+        return pickled
+
+    def set(self, key, pickled, ttl):
+        evicted = 0
+        with self.lock:
+            self.data[key] = (time.monotonic() + ttl, pickled)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self.count("l1_evictions", evicted)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.stats[name] += value
+        CACHE_EVENTS.labels(name).inc(value)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class TwoTierCache(BaseCache):
+    """Кэш из двух уровней: LRU в памяти процесса перед общим кэшем.
+
+    Запись идёт в общий кэш (OPTIONS["L2"] — алиас из CACHES) и в L1
+    процесса. Чтение сначала смотрит в L1, поэтому изменения из других
+    воркеров видны с задержкой не больше L1_TIMEOUT секунд. Блокировки
+    (add) и счётчики (incr) всегда проходят через общий кэш и атомарны
+    настолько, насколько атомарен он сам: Redis - да, файловый кэш - нет.
+    Время вызовов, включая попадания в L1, идёт в фазу cache
+    Server-Timing.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.l2_alias = options["L2"]
+        self.l1_timeout = options.get("L1_TIMEOUT", 5)
+        with _stores_lock:
+            if location not in _stores:
+                _stores[location] = LRUStore(
+                    options.get("L1_MAX_ENTRIES", 1024))
+            self.store = _stores[location]
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def l1_ttl(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.l1_timeout
+        return min(timeout, self.l1_timeout)
+
+    def remember(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        ttl = self.l1_ttl(timeout)
+        l1_key = self.make_key(key, version=version)
+        if ttl > 0:
+            pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            self.store.set(l1_key, pickled, ttl)
+        else:
+            self.store.delete(l1_key)
+
+    @timed_cache_method
+    def get(self, key, default=None, version=None):
+        pickled = self.store.get(self.make_key(key, version=version))
+        if pickled is not None:
+            return pickle.loads(pickled)
+        value = self.l2.get(key, MISSING, version=version)
+        if value is MISSING:
+            self.store.count("l2_misses")
+            return default
+        self.store.count("l2_hits")
+        self.remember(key, value, version=version)
+        return value
+
+    @timed_cache_method
+    def get_many(self, keys, version=None):
+        found, missing = {}, []
+        for key in keys:
+            pickled = self.store.get(self.make_key(
+                key, version=version))
+            if pickled is None:
+                missing.append(key)
+            else:
+                found[key] = pickle.loads(pickled)
+        if missing:
+            loaded = self.l2.get_many(missing, version=version)
+            self.store.count("l2_hits", len(loaded))
+            self.store.count("l2_misses", len(missing) - len(loaded))
+            for key, value in loaded.items():
+                self.remember(key, value, version=version)
+            found.update(loaded)
+        return found
+
+    @timed_cache_method
+    def has_key(self, key, version=None):
+        return (
+            self.store.get(self.make_key(key, version=version))
+            is not None or self.l2.has_key(key, version=version)
+        )
+
+    @timed_cache_method
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        self.remember(key, value, timeout, version)
+
+    @timed_cache_method
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self.remember(key, value, timeout, version)
+        return failed
+
+    @timed_cache_method
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if not self.l2.add(key, value, timeout, version=version):
+            return False
+        self.remember(key, value, timeout, version)
+        return True
+
+    @timed_cache_method
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version=version)
+        self.remember(key, value, version=version)
+        return value
+
+    @timed_cache_method
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout, version=version)
+
+    @timed_cache_method
+    def delete(self, key, version=None):
+        self.store.delete(self.make_key(key, version=version))
+        return self.l2.delete(key, version=version)
+
+    @timed_cache_method
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.store.delete(self.make_key(key, version=version))
+        self.l2.delete_many(keys, version=version)
+
+    @timed_cache_method
+    def clear(self):
+        self.store.clear()
+        self.l2.clear()
+
+
+def cache_stats(alias="default"):
+    """Счётчики L1 и L2 текущего процесса"""
+    store = getattr(caches[alias], "store", None)
+    if store is None:
+        return {}
+    with store.lock:
+        return dict(store.stats, l1_entries=len(store.data))
+
+
+def namespace_key(name):
+    return f"namespace:{name}"
+
+
+def namespace_versions(names):
+    """Текущие версии пространств имён ключей кэша"""
+    versions = cache.get_many([namespace_key(name) for name in names])
+    return {
+        name: versions.get(namespace_key(name)) or cache.get_or_set(
+            namespace_key(name), time.time_ns, None)
+        for name in names
+    }
+
+
+def namespace_version(name):
+    return namespace_versions([name])[name]
+
+
+def bump_namespace(name):
+    """Сбрасывает все ключи пространства имён за одну запись"""
+    cache.set(namespace_key(name), time.time_ns(), None)
+
+
+def bump_table_version(table):
+    """Делает недействительными все закэшированные счётчики по таблице"""
+    bump_namespace(f"table:{table}")
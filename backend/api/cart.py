@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from recipes.models import ShoppingCart
+
+
+def cart_count_key(user_id):
+    return f"cart:count:{user_id}"
+
+
+def get_cart_count(user):
+    """Число рецептов в корзине, считается в БД только при промахе кэша"""
+    if not user.is_authenticated:
+        return 0
+    key = cart_count_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = ShoppingCart.objects.filter(user_id=user.pk).count()
+        cache.set(key, count, settings.CART_COUNT_TIMEOUT)
+    return count
+
+
+def forget_cart_count(user_id):
+    """Сброс счётчика после коммита изменения корзины.
+
+    Пока транзакция не закоммичена, чтение может успеть закэшировать
+    старое число, поэтому ключ удаляется уже после коммита.
+    """
+    key = cart_count_key(user_id)
+    transaction.on_commit(lambda: cache.delete(key))
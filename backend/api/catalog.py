@@ -0,0 +1,132 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from recipes.models import Ingredient
+from api.cache import bump_namespace, namespace_version
+from api.compression import BEST, choose_encoding, compress
+from jobs.queue import task
+
+
+CATALOG_TIMEOUT = 24 * 60 * 60
+
+SNAPSHOT_DIR = "catalog"
+SNAPSHOT_MANIFEST = f"{SNAPSHOT_DIR}/ingredients.json"
+SNAPSHOT_KEY = "catalog:ingredients:snapshot"
+# Манифест пишет воркер, у которого может быть свой кэш, поэтому в кэше
+# процесса API он живёт недолго и перечитывается из хранилища
+SNAPSHOT_TIMEOUT = 60
+# Сколько прошлых снимков хранить для клиентов со старой версией
+SNAPSHOT_KEEP = 3
+
+
+def catalog_version():
+    return namespace_version("catalog")
+
+
+def bump_catalog_version():
+    bump_namespace("catalog")
+
+
+def catalog_changed():
+    """Вызывается при любом изменении справочника ингредиентов"""
+    bump_catalog_version()
+    cache.delete(SNAPSHOT_KEY)
+    write_catalog_snapshot.delay()
+
+
+def catalog_body(encoding, build):
+    """Готовый (и сжатый) ответ со справочником для текущей версии"""
+    key = f"catalog:ingredients:{catalog_version()}:{encoding or 'identity'}"
+    body = cache.get(key)
+    if body is None:
+        if encoding:
+            body = compress(catalog_body(None, build), encoding, BEST)
+        else:
+            body = build()
+        cache.set(key, body, CATALOG_TIMEOUT)
+    return body
+
+
+def catalog_response(request, build):
+    """Полный список ингредиентов без сериализации и сжатия на запрос.
+
+    build возвращает JSON справочника в байтах и вызывается только
+    при первом запросе после изменения справочника.
+    """
+    encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+    response = HttpResponse(catalog_body(encoding, build),
+                            content_type="application/json")
+    if encoding:
+        response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ("Accept", "Accept-Encoding"))
+    return response
+
+
+def render_catalog():
+    # DRF нужен только при сборке, сигналы и команды обходятся без него
+    from api.renderers import FastJSONRenderer
+    from api.serializers import IngredientSerializer
+
+    return FastJSONRenderer().render(
+        IngredientSerializer(Ingredient.objects.all(), many=True).data)
+
+
+@task(unique=True)
+def write_catalog_snapshot():
+    """Пишет справочник в media/catalog/ingredients.<хэш>.json.
+
+    Имя файла зависит от содержимого, поэтому nginx отдаёт его с
+    immutable-кэшированием, а клиенты узнают текущее имя через
+    /api/ingredients/version/. Рядом кладётся .gz для gzip_static.
+    """
+    content = render_catalog()
+    version = hashlib.sha256(content).hexdigest()[:16]
+    name = f"{SNAPSHOT_DIR}/ingredients.{version}.json"
+    if not default_storage.exists(name):
+        default_storage.save(f"{name}.gz",
+                             ContentFile(compress(content, "gzip", BEST)))
+        # Сам снимок пишется последним: по нему проверяется готовность
+        default_storage.save(name, ContentFile(content))
+
+    manifest = {"version": version, "url": default_storage.url(name)}
+    default_storage.delete(SNAPSHOT_MANIFEST)
+    default_storage.save(SNAPSHOT_MANIFEST,
+                         ContentFile(json.dumps(manifest).encode()))
+    # При общем кэше новый манифест виден сразу, иначе - через
+    # SNAPSHOT_TIMEOUT
+    cache.delete(SNAPSHOT_KEY)
+    prune_snapshots(keep=name)
+    return manifest
+
+
+def prune_snapshots(keep):
+    _, files = default_storage.listdir(SNAPSHOT_DIR)
+    snapshots = sorted(
+        (name for name in files
+         if name.startswith("ingredients.") and name.count(".") == 2
+         and f"{SNAPSHOT_DIR}/{name}" != keep),
+        key=lambda name: default_storage.get_modified_time(
+            f"{SNAPSHOT_DIR}/{name}"),
+        reverse=True,
+    )
+    for name in snapshots[SNAPSHOT_KEEP - 1:]:
+        default_storage.delete(f"{SNAPSHOT_DIR}/{name}")
+        default_storage.delete(f"{SNAPSHOT_DIR}/{name}.gz")
+
+
+def catalog_snapshot():
+    """Версия и адрес текущего снимка справочника"""
+    manifest = cache.get(SNAPSHOT_KEY)
+    if manifest is None:
+        try:
+            with default_storage.open(SNAPSHOT_MANIFEST) as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            return write_catalog_snapshot()
+        cache.set(SNAPSHOT_KEY, manifest, SNAPSHOT_TIMEOUT)
+    return manifest
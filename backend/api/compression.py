@@ -0,0 +1,80 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+# Степень сжатия на лету и для заранее сжатых ответов
+FAST, BEST = "fast", "best"
+GZIP_LEVELS = {FAST: 6, BEST: 9}
+BROTLI_QUALITY = {FAST: 4, BEST: 11}
+
+
+def choose_encoding(accept_encoding):
+    """Лучшее из поддерживаемых клиентом сжатий: br, gzip или None"""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if params and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def is_compressible(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(data, encoding, level=FAST):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY[level])
+    compressor = zlib.compressobj(GZIP_LEVELS[level], zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+class StreamCompressor:
+    """Сжатие по кускам: каждый кусок сразу уходит клиенту"""
+
+    def __init__(self, encoding):
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY[FAST])
+            self.flush = self.compressor.flush
+            self.process = self.compressor.process
+            self.finish = self.compressor.finish
+        else:
+            self.compressor = zlib.compressobj(
+                GZIP_LEVELS[FAST], zlib.DEFLATED, 31)
+            self.process = self.compressor.compress
+            self.flush = lambda: self.compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = self.compressor.flush
+
+    def compress(self, chunk):
+        return self.process(chunk) + self.flush()
+
+
+def compress_stream(chunks, encoding):
+    compressor = StreamCompressor(encoding)
+    for chunk in chunks:
+        if data := compressor.compress(chunk):
+            yield data
+    yield compressor.finish()
+
+
+async def acompress_stream(chunks, encoding):
+    compressor = StreamCompressor(encoding)
+    async for chunk in chunks:
+        if data := compressor.compress(chunk):
+            yield data
+    yield compressor.finish()
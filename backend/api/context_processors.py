@@ -0,0 +1,12 @@
+from api.cart import get_cart_count
+from api.relations import get_relations
+
+
+def cart_count(request):
+    """Число рецептов в корзине для шаблонов, считается при обращении"""
+    return {"cart_count": lambda: get_cart_count(request.user)}
+
+
+def viewer(request):
+    """Подписки, избранное и корзина пользователя, загружаются по запросу"""
+    return {"viewer": get_relations(request)}
@@ -0,0 +1,14 @@
+from drf_yasg import openapi
+from drf_yasg.views import get_schema_view
+from rest_framework.permissions import AllowAny
+
+
+swagger_info = openapi.Info(
+    title="Foodgram API",
+    default_version="v1",
+    description="API сервиса рецептов Foodgram",
+)
+
+schema_view = get_schema_view(public=True, permission_classes=[AllowAny])
+schema = schema_view.without_ui(cache_timeout=60 * 60)
+swagger_ui = schema_view.with_ui("swagger", cache_timeout=60 * 60)
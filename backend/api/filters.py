@@ -1,16 +1,53 @@
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
 from django_filters.rest_framework import FilterSet, BooleanFilter, CharFilter
 from recipes.models import Recipe, Ingredient
 from django_filters import rest_framework as filters
 
 
+INGREDIENT_MATCH_RATIO = f"""
+    cardinality(ARRAY(
+        SELECT unnest({Recipe._meta.db_table}.ingredient_ids)
+        INTERSECT SELECT unnest(%s::bigint[])
+    ))::float
+    / GREATEST(cardinality({Recipe._meta.db_table}.ingredient_ids), 1)
+"""
+
+
+def filter_by_ingredients(queryset, value, match):
+    """Поиск рецептов по набору ингредиентов через индекс ingredient_ids.
+
+    all - есть все ингредиенты, any - хотя бы один, best - хотя бы один,
+    сначала рецепты с наибольшей долей имеющихся ингредиентов.
+    """
+    ingredient_ids = sorted({
+        int(item) for item in value.split(",") if item.strip().isdigit()
+    })
+    if not ingredient_ids:
+        return queryset
+    if match == "any":
+        return queryset.filter(ingredient_ids__overlap=ingredient_ids)
+    if match == "best":
+        return queryset.filter(
+            ingredient_ids__overlap=ingredient_ids
+        ).annotate(
+            ingredient_match=RawSQL(INGREDIENT_MATCH_RATIO,
+                                    (ingredient_ids,),
+                                    output_field=FloatField()),
+        ).order_by("-ingredient_match", "-id")
+    return queryset.filter(ingredient_ids__contains=ingredient_ids)
+
+
 class RecipeFilter(FilterSet):
     is_favorited = BooleanFilter(method="filter_is_favorited")
     is_in_shopping_cart = BooleanFilter(method="filter_is_in_shopping_cart")
     author = filters.NumberFilter(field_name="author__id")
+    ingredients = CharFilter(method="filter_ingredients")
 
     class Meta:
         model = Recipe
-        fields = ["is_favorited", "is_in_shopping_cart", "author"]
+        fields = ["is_favorited", "is_in_shopping_cart", "author",
+                  "ingredients"]
 
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
@@ -24,6 +61,11 @@ class RecipeFilter(FilterSet):
 
         return queryset
 
+    def filter_ingredients(self, queryset, name, value):
+        """Фильтрация по ингредиентам, режим задаётся параметром match"""
+        return filter_by_ingredients(queryset, value,
+                                     self.data.get("match", "all"))
+
 
 class IngredientFilter(FilterSet):
     name = CharFilter(field_name="name", lookup_expr="icontains")
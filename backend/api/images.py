@@ -0,0 +1,114 @@
+import base64
+import binascii
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+
+# Форматы, которые принимаются, и расширение сохранённого файла
+FORMATS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+
+# Длина куска base64 для декодирования, кратна 4
+CHUNK_CHARS = 64 * 1024
+
+HEADER_LIMIT = 100
+
+
+class ImageError(ValueError):
+    pass
+
+
+def spooled_file():
+    return tempfile.SpooledTemporaryFile(
+        max_size=settings.IMAGE_SPOOL_SIZE, suffix=".upload")
+
+
+def decode_data_url(data):
+    """Декодирует data:image/...;base64 кусками во временный файл.
+
+    Строка не копируется целиком: декодируются срезы по CHUNK_CHARS
+    символов, результат держится в памяти до IMAGE_SPOOL_SIZE байт, дальше
+    пишется на диск.
+    """
+    start = data.find(";base64,", 0, HEADER_LIMIT)
+    if start == -1:
+        raise ImageError("Ожидается изображение в формате data:image/*;base64")
+    start += len(";base64,")
+    if (len(data) - start) * 3 // 4 > settings.IMAGE_MAX_UPLOAD_SIZE:
+        raise ImageError("Файл изображения слишком большой")
+
+    file = spooled_file()
+    tail = ""
+    try:
+        for offset in range(start, len(data), CHUNK_CHARS):
+            chunk = tail + "".join(data[offset:offset + CHUNK_CHARS].split())
+            usable = len(chunk) - len(chunk) % 4
+            file.write(base64.b64decode(chunk[:usable], validate=True))
+            tail = chunk[usable:]
+    except binascii.Error as error:
+        file.close()
+        raise ImageError("Некорректные данные base64") from error
+    if tail:
+        file.close()
+        raise ImageError("Некорректные данные base64")
+    file.seek(0)
+    return file
+
+
+def check_image(file):
+    """Проверяет формат и размеры по заголовку, не распаковывая пиксели"""
+    try:
+        with Image.open(file) as image:
+            image_format = image.format
+            width, height = image.size
+            if image_format not in FORMATS:
+                raise ImageError(
+                    f"Неподдерживаемый формат изображения: {image_format}")
+            if width * height > settings.IMAGE_MAX_PIXELS:
+                raise ImageError(
+                    f"Изображение слишком большое: {width}x{height}")
+            image.verify()
+    except Image.DecompressionBombError as error:
+        raise ImageError("Изображение слишком большое") from error
+    except (UnidentifiedImageError, OSError, SyntaxError) as error:
+        raise ImageError("Файл не является изображением") from error
+    finally:
+        file.seek(0)
+    return image_format
+
+
+def image_from_data_url(data):
+    """Загруженный файл с расширением по фактическому формату"""
+    file = decode_data_url(data)
+    try:
+        image_format = check_image(file)
+    except ImageError:
+        file.close()
+        raise
+    file.seek(0, 2)
+    size = file.tell()
+    file.seek(0)
+    return UploadedFile(
+        file, name=f"{uuid.uuid4()}.{FORMATS[image_format]}",
+        content_type=Image.MIME[image_format], size=size)
+
+
+def downscale(upload, size):
+    """Квадратная уменьшенная копия по центру изображения в WEBP"""
+    upload.seek(0)
+    with Image.open(upload) as image:
+        # JPEG распаковывается сразу в уменьшенном масштабе
+        image.draft("RGB", (size, size))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+    file = spooled_file()
+    thumbnail.save(file, "WEBP", quality=85)
+    size = file.tell()
+    file.seek(0)
+    return UploadedFile(file, name=f"{uuid.uuid4()}.webp",
+                        content_type="image/webp", size=size)
@@ -0,0 +1,165 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from users.models import User, Follow
+from recipes.feed import get_feed_queryset
+from recipes.models import (Recipe, Ingredient, RecipeIngredient, Favorite,
+                            ShoppingCart)
+from api.filters import filter_by_ingredients
+from api.views import RecipeViewSet
+
+
+def hot_queries(user, author, recipe):
+    """Горячие запросы API: (название, queryset, допустима ли сортировка)"""
+    recipes = RecipeViewSet.queryset
+    cart_recipe_ids = user.shopping_carts.values_list("recipe_id", flat=True)
+    return [
+        ("recipe_list", recipes[:6], False),
+        ("recipe_list_popular",
+         recipes.order_by("-popularity", "-id")[:6], False),
+        ("recipe_list_author", recipes.filter(author=author)[:6], False),
+        ("recipe_list_favorited",
+         recipes.filter(in_favorites__user=user)[:6], False),
+        ("recipe_list_in_cart",
+         recipes.filter(in_shopping_carts__user=user)[:6], False),
+        # Отобранные индексом строки сортируются, их немного
+        ("recipe_list_ingredients",
+         filter_by_ingredients(recipes, ",".join(
+             str(pk) for pk in recipe.ingredient_ids[:2]), "all")[:6], True),
+        ("recipe_detail", Recipe.objects.filter(pk=recipe.pk), False),
+        ("recipe_ingredients",
+         RecipeIngredient.objects.filter(recipe=recipe)
+         .select_related("ingredient"), False),
+        ("is_favorited",
+         Favorite.objects.filter(user=user, recipe=recipe), False),
+        ("is_in_shopping_cart",
+         ShoppingCart.objects.filter(user=user, recipe=recipe), False),
+        ("is_subscribed",
+         Follow.objects.filter(user=user, author=author), False),
+        ("followers", Follow.objects.filter(author=author), False),
+        ("author_recipes",
+         author.recipes.order_by("-date_created")[:3], False),
+        ("subscriptions",
+         user.following.select_related("author").order_by("id")[:6], False),
+        ("feed",
+         get_feed_queryset(user).order_by("-date_created", "-recipe_id")[:7],
+         False),
+        ("shopping_cart",
+         user.shopping_carts.order_by("-date_added"), False),
+        # Итоговый список группируется и сортируется по названию
+        ("download_shopping_cart",
+         RecipeIngredient.objects.filter(recipe_id__in=cart_recipe_ids)
+         .values("ingredient__name", "ingredient__measurement_unit")
+         .annotate(total_amount=Sum("amount"))
+         .order_by("ingredient__name"), True),
+        ("ingredient_search",
+         Ingredient.objects.filter(name__istartswith="аб"), True),
+    ]
+
+
+def plan_problems(node, allow_sort):
+    problems = []
+    if node["Node Type"] == "Seq Scan":
+        problems.append(f"Seq Scan on {node['Relation Name']}")
+    if node["Node Type"] in ("Sort", "Incremental Sort") and not allow_sort:
+        problems.append(f"{node['Node Type']} by "
+                        f"{', '.join(node.get('Sort Key', []))}")
+    for child in node.get("Plans", []):
+        problems.extend(plan_problems(child, allow_sort))
+    return problems
+
+
+class Command(BaseCommand):
+    help = ("Проверка планов горячих запросов: падает на Seq Scan и "
+            "сортировках, не покрытых индексом")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed", type=int, default=0,
+            help="создать столько рецептов во временной транзакции",
+        )
+        parser.add_argument("--verbose-plans", action="store_true")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed(options["seed"])
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+                # Без индекса планировщик оставит Seq Scan и Sort
+                # даже при запрете, это и ловим
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("SET LOCAL enable_sort = off")
+            failures = self.check_plans(options["verbose_plans"])
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(
+                f"Запросов с неиндексированным планом: {failures}")
+        self.stdout.write(self.style.SUCCESS("Все планы используют индексы"))
+
+    def check_plans(self, verbose):
+        user = (User.objects.filter(following__isnull=False,
+                                    shopping_carts__isnull=False)
+                .first())
+        recipe = Recipe.objects.exclude(ingredient_ids=[]).first()
+        if user is None or recipe is None:
+            raise CommandError("Нет данных для проверки, используйте --seed")
+        author = user.following.first().author
+
+        failures = 0
+        for name, queryset, allow_sort in hot_queries(user, author, recipe):
+            plan = json.loads(queryset.explain(format="json"))[0]["Plan"]
+            problems = plan_problems(plan, allow_sort)
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(
+                    f"{name}: {'; '.join(problems)}"))
+            else:
+                self.stdout.write(f"{name}: OK")
+            if verbose or problems:
+                self.stdout.write(queryset.explain())
+        return failures
+
+    def seed(self, recipes_count):
+        """Синтетические данные, откатываются вместе с транзакцией"""
+        if not Ingredient.objects.exists():
+            Ingredient.objects.bulk_create(
+                Ingredient(name=f"ингредиент {i}", measurement_unit="г")
+                for i in range(2000)
+            )
+        ingredient_ids = list(Ingredient.objects.values_list("id", flat=True))
+        users = User.objects.bulk_create(
+            User(email=f"explain{i}@example.com", username=f"explain{i}")
+            for i in range(max(recipes_count // 20, 10))
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author=random.choice(users), title=f"Рецепт {i}",
+                   image="recipes/images/explain.png", description="",
+                   preparation_time=10,
+                   ingredient_ids=sorted(random.sample(ingredient_ids, 8)))
+            for i in range(recipes_count)
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient_id=ingredient_id,
+                             amount=1)
+            for recipe in recipes for ingredient_id in recipe.ingredient_ids
+        )
+        for user in users:
+            follows = Follow.objects.bulk_create(
+                Follow(user=user, author=author)
+                for author in random.sample(users, 5) if author != user
+            )
+            User.objects.filter(pk=user.pk).update(
+                following_count=len(follows))
+            Favorite.objects.bulk_create(
+                Favorite(user=user, recipe=recipe)
+                for recipe in random.sample(recipes, 20)
+            )
+            ShoppingCart.objects.bulk_create(
+                ShoppingCart(user=user, recipe=recipe)
+                for recipe in random.sample(recipes, 5)
+            )
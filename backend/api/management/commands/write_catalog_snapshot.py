@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from api.catalog import bump_catalog_version, write_catalog_snapshot
+
+
+class Command(BaseCommand):
+    help = "Запись статического снимка справочника ингредиентов"
+
+    def handle(self, *args, **options):
+        bump_catalog_version()
+        manifest = write_catalog_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"Снимок {manifest['version']}: {manifest['url']}"))
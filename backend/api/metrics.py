@@ -0,0 +1,227 @@
+import hashlib
+import hmac
+import ipaddress
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+from prometheus_client import (REGISTRY, CollectorRegistry, Counter,
+                               Histogram, multiprocess)
+from prometheus_client.core import GaugeMetricFamily
+
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    # manage.py тоже пишет метрики, даже если gunicorn ещё не запускался
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+REQUEST_LATENCY = Histogram(
+    "foodgram_http_request_duration_seconds",
+    "Время обработки запроса", ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter(
+    "foodgram_http_requests_total", "Запросы по статусам",
+    ["method", "route", "status"],
+)
+DB_QUERIES = Counter(
+    "foodgram_db_queries_total", "SQL-запросы по маршрутам", ["route"],
+)
+DB_TIME = Counter(
+    "foodgram_db_query_duration_seconds_total",
+    "Время SQL-запросов по маршрутам", ["route"],
+)
+CACHE_EVENTS = Counter(
+    "foodgram_cache_events_total",
+    "Попадания, промахи и вытеснения двухуровневого кэша", ["event"],
+)
+SQL_TIME = Counter(
+    "foodgram_sql_fingerprint_duration_seconds_total",
+    "Время SQL-запросов по нормализованному тексту",
+    ["fingerprint", "statement"],
+)
+SQL_CALLS = Counter(
+    "foodgram_sql_fingerprint_calls_total",
+    "Число SQL-запросов по нормализованному тексту",
+    ["fingerprint", "statement"],
+)
+JOBS = Counter(
+    "foodgram_jobs_total", "Выполнения фоновых заданий по исходу",
+    ["name", "outcome"],
+)
+JOB_DURATION = Histogram(
+    "foodgram_job_duration_seconds", "Время выполнения фонового задания",
+    ["name"], buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300),
+)
+JOB_WAIT = Histogram(
+    "foodgram_job_wait_seconds",
+    "Ожидание задания в очереди после назначенного времени", ["name"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800),
+)
+SQL_FAMILIES = {"foodgram_sql_fingerprint_duration_seconds",
+                "foodgram_sql_fingerprint_calls"}
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+VALUE_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+SPACES = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """Короткий хэш и текст запроса без значений и длины списков IN"""
+    statement = LITERALS.sub("?", sql)
+    statement = VALUE_LISTS.sub("(...)", statement)
+    statement = SPACES.sub(" ", statement).strip()
+    digest = hashlib.md5(statement.encode()).hexdigest()[:12]
+    return digest, statement[:300]
+
+
+_query_stats = ContextVar("query_stats", default=None)
+
+
+class QueryStats:
+    """Число и время SQL-запросов одного HTTP-запроса"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка execute каждого соединения.
+
+    Считает запрос в QueryStats из контекста. Контекст переходит и в потоки
+    sync_to_async, где у асинхронных представлений свои соединения.
+    """
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.count += 1
+        stats.duration += elapsed
+        labels = fingerprint(sql)
+        SQL_TIME.labels(*labels).inc(elapsed)
+        SQL_CALLS.labels(*labels).inc()
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Обработчик connection_created: ставит record_query на соединение"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def track_queries():
+    """QueryStats, в которую попадают SQL-запросы внутри блока"""
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def route_name(request):
+    match = request.resolver_match
+    return match.route if match else "<unmatched>"
+
+
+class TopStatements:
+    """Из метрик SQL оставляет METRICS_TOP_STATEMENTS самых долгих"""
+
+    def __init__(self, registry, limit):
+        self.registry = registry
+        self.limit = limit
+
+    def collect(self):
+        families = list(self.registry.collect())
+        top = set()
+        for family in families:
+            if family.name == "foodgram_sql_fingerprint_duration_seconds":
+                totals = {
+                    sample.labels["fingerprint"]: sample.value
+                    for sample in family.samples
+                    if sample.name.endswith("_total")
+                }
+                top = set(sorted(totals, key=totals.get,
+                                 reverse=True)[:self.limit])
+        for family in families:
+            if family.name in SQL_FAMILIES:
+                family.samples = [
+                    sample for sample in family.samples
+                    if sample.labels.get("fingerprint") in top
+                ]
+            yield family
+
+
+class JobQueue:
+    """Число заданий в очереди по статусам, считается при опросе"""
+
+    def gauge(self):
+        return GaugeMetricFamily("foodgram_job_queue", "Задания по статусам",
+                                 labels=["status"])
+
+    def describe(self):
+        yield self.gauge()
+
+    def collect(self):
+        from django.db.models import Count
+        from jobs.models import Job
+
+        gauge = self.gauge()
+        counts = dict(Job.objects.values_list("status").annotate(
+            Count("id")).order_by())
+        for status, _ in Job.STATUS_CHOICES:
+            gauge.add_metric([status], counts.get(status, 0))
+        yield gauge
+
+
+if not MULTIPROC_DIR:
+    REGISTRY.register(JobQueue())
+
+
+def get_registry():
+    """Метрики всех воркеров gunicorn или текущего процесса"""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(JobQueue())
+    else:
+        registry = REGISTRY
+    return TopStatements(registry, settings.METRICS_TOP_STATEMENTS)
+
+
+@lru_cache(maxsize=None)
+def allowed_networks(networks):
+    return tuple(ipaddress.ip_network(network.strip(), strict=False)
+                 for network in networks.split(",") if network.strip())
+
+
+def metrics_allowed(request):
+    """Доступ к /metrics по токену, сети клиента или staff-сессии"""
+    token = settings.METRICS_TOKEN
+    if token:
+        keyword, _, value = request.headers.get(
+            "Authorization", "").partition(" ")
+        if keyword == "Bearer" and hmac.compare_digest(
+                value.strip().encode(), token.encode()):
+            return True
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        address = None
+    if address is not None and any(
+            address in network
+            for network in allowed_networks(
+                settings.METRICS_ALLOWED_NETWORKS)):
+        return True
+    user = getattr(request, "user", None)
+    return user is not None and user.is_staff
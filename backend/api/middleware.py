@@ -0,0 +1,298 @@
+import cProfile
+import os
+import random
+import re
+import time
+
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.cart import get_cart_count
+from api.compression import (acompress_stream, choose_encoding, compress,
+                             compress_stream, is_compressible)
+from api.metrics import (DB_QUERIES, DB_TIME, REQUEST_LATENCY, REQUESTS,
+                         route_name, track_queries)
+from api.profiling import save_profile
+from api.timing import start_timing, stop_timing
+
+
+def staff_user(request):
+    """Staff-пользователь запроса по сессии или токену, иначе None"""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        # DRF проверит токен ещё раз уже в представлении
+        try:
+            credentials = TokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            credentials = None
+        user = credentials[0] if credentials else None
+    return user if user is not None and user.is_staff else None
+
+
+class HybridMiddleware:
+    """Middleware и для WSGI, и для ASGI без адаптации цепочки.
+
+    Под ASGI Django вызывает __call__ из цикла событий, и он возвращает
+    корутину __acall__, иначе вся цепочка и асинхронные представления
+    переводились бы в синхронный режим через потоки.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+class CartCountHeaderMiddleware(HybridMiddleware):
+    """Заголовок X-Cart-Count в ответах API для авторизованных клиентов"""
+
+    def handle(self, request):
+        response = self.get_response(request)
+        if request.path.startswith("/api/"):
+            self.add_header(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if request.path.startswith("/api/"):
+            # request.user может читать сессию из базы
+            await sync_to_async(self.add_header)(request, response)
+        return response
+
+    def add_header(self, request, response):
+        # DRF после аутентификации по токену выставляет request.user
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            response["X-Cart-Count"] = get_cart_count(user)
+
+
+class CompressionMiddleware(HybridMiddleware):
+    """Сжатие ответов API в br или gzip.
+
+    Обычные ответы сжимаются целиком, если они не меньше
+    COMPRESSION_MIN_SIZE, потоковые сжимаются по кускам без буферизации.
+    """
+
+    def handle(self, request):
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request,
+                                     await self.get_response(request))
+
+    def process_response(self, request, response):
+        if (
+            not request.path.startswith("/api/")
+            or response.has_header("Content-Encoding")
+            or not is_compressible(response.get("Content-Type", ""))
+            or (not response.streaming
+                and len(response.content) < settings.COMPRESSION_MIN_SIZE)
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(
+                    response.streaming_content, encoding)
+            else:
+                response.streaming_content = compress_stream(
+                    response.streaming_content, encoding)
+            del response.headers["Content-Length"]
+        else:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        if etag := response.get("ETag"):
+            response.headers["ETag"] = re.sub(r'^"', 'W/"', etag)
+        response["Content-Encoding"] = encoding
+        return response
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    """Профилирование запроса через cProfile.
+
+    Включается для staff заголовком X-Profile: 1 или параметром ?profile=1
+    либо случайно с вероятностью PROFILING_SAMPLE_RATE. Пользователь
+    определяется по сессии или токену до запуска профилировщика, поэтому
+    запросы остальных пользователей не профилируются. Профили лежат в
+    PROFILING_DIR. Под ASGI профилировщик видит весь поток цикла событий,
+    поэтому в профиль попадают и параллельные запросы.
+    """
+
+    def handle(self, request):
+        sampled = self.sampled()
+        staff = staff_user(request) if self.requested(request) else None
+        if not (sampled or staff):
+            return self.get_response(request)
+        profiler = self.start()
+        if profiler is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        self.save(request, response, profiler, sampled, staff,
+                  time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        sampled = self.sampled()
+        staff = (await sync_to_async(staff_user)(request)
+                 if self.requested(request) else None)
+        if not (sampled or staff):
+            return await self.get_response(request)
+        profiler = self.start()
+        if profiler is None:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.disable()
+        await sync_to_async(self.save)(request, response, profiler, sampled,
+                                       staff, time.perf_counter() - started)
+        return response
+
+    def sampled(self):
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def requested(self, request):
+        return (request.headers.get("X-Profile") == "1"
+                or request.GET.get("profile") == "1")
+
+    def start(self):
+        """Включённый профилировщик или None, если он уже работает"""
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # В потоке уже работает другой профилировщик
+            return None
+        return profiler
+
+    def save(self, request, response, profiler, sampled, staff, duration):
+        match = request.resolver_match
+        profile_id = save_profile(profiler, {
+            "pid": os.getpid(),
+            "method": request.method,
+            "path": request.path,
+            "route": match.route if match else request.path,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 1),
+            "user_id": staff.pk if staff else None,
+            "sampled": sampled,
+        })
+        if staff:
+            response["X-Profile-Id"] = profile_id
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """Время, статусы и SQL-запросы по маршрутам для /metrics"""
+
+    def handle(self, request):
+        started = time.perf_counter()
+        with track_queries() as stats:
+            # ServerTimingMiddleware берёт отсюда время SQL
+            request.query_stats = stats
+            response = self.get_response(request)
+        self.observe(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with track_queries() as stats:
+            request.query_stats = stats
+            response = await self.get_response(request)
+        self.observe(request, response, stats, started)
+        return response
+
+    def observe(self, request, response, stats, started):
+        duration = time.perf_counter() - started
+        route = route_name(request)
+        REQUEST_LATENCY.labels(request.method, route).observe(duration)
+        REQUESTS.labels(request.method, route, response.status_code).inc()
+        DB_QUERIES.labels(route).inc(stats.count)
+        DB_TIME.labels(route).inc(stats.duration)
+
+
+class ServerTimingMiddleware(HybridMiddleware):
+    """Заголовок Server-Timing в ответах API и коротких ссылок.
+
+    Замер идёт только для доли SERVER_TIMING_SAMPLE_RATE запросов и для
+    запросов с заголовком X-Server-Timing: 1; во втором случае заголовок
+    получают только staff. Фазы db и cache считаются для любого
+    представления, viewset'ы с ServerTimingMixin добавляют auth, serialize
+    и render. Стоит после MetricsMiddleware, которая считает SQL-запросы.
+    """
+
+    paths = ("/api/", "/s/")
+
+    def handle(self, request):
+        sampled = self.sampled()
+        if not self.measured(request, sampled):
+            return self.get_response(request)
+        timing, token = start_timing(getattr(request, "query_stats", None))
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_timing(token)
+        self.add_header(request, response, timing, sampled)
+        return response
+
+    async def __acall__(self, request):
+        sampled = self.sampled()
+        if not self.measured(request, sampled):
+            return await self.get_response(request)
+        timing, token = start_timing(getattr(request, "query_stats", None))
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_timing(token)
+        if sampled:
+            self.add_header(request, response, timing, sampled)
+        else:
+            # Пользователь без токена может загружаться из сессии
+            await sync_to_async(self.add_header)(request, response, timing,
+                                                 sampled)
+        return response
+
+    def sampled(self):
+        return random.random() < settings.SERVER_TIMING_SAMPLE_RATE
+
+    def measured(self, request, sampled):
+        return request.path.startswith(self.paths) and (
+            sampled or request.headers.get("X-Server-Timing") == "1")
+
+    def add_header(self, request, response, timing, sampled):
+        # Пользователя уже определило представление: DRF и асинхронные
+        # представления записывают пользователя токена в request.user
+        user = getattr(request, "user", None)
+        if sampled or (user is not None and user.is_staff):
+            response["Server-Timing"] = timing.header()
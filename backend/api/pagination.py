@@ -1,7 +1,103 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from api.cache import namespace_versions
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = "limit"
     max_page_size = 100
+
+
+class FeedCursorPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = "limit"
+    max_page_size = 100
+    # Поля словарей get_feed_queryset
+    ordering = ("-date_created", "-recipe_id")
+
+
+def count_cache_key(queryset):
+    """Ключ по SQL запроса (фильтры и пользователь) и версиям его таблиц.
+
+    None, если запрос читает таблицу, запись в которую не сбрасывает
+    версию (см. COUNTED_MODELS).
+    """
+    from api.signals import COUNTED_MODELS
+
+    tables = {join.table_name for join in queryset.query.alias_map.values()}
+    if not tables <= {model._meta.db_table for model in COUNTED_MODELS}:
+        return None
+    versions = namespace_versions(sorted(
+        f"table:{table}" for table in tables))
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(
+        f"{sql}|{params!r}|{sorted(versions.items())!r}".encode()
+    ).hexdigest()
+    return f"pagination:count:{digest}"
+
+
+def estimated_count(model):
+    """Оценка числа строк таблицы из статистики планировщика Postgres"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return int(row[0]) if row else -1
+
+
+class CachedCountPaginator(Paginator):
+    count_exact = True
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model)
+            if estimate >= settings.PAGINATION_ESTIMATE_THRESHOLD:
+                self.count_exact = False
+                return estimate
+
+        key = count_cache_key(queryset)
+        if key is None:
+            return queryset.count()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, settings.PAGINATION_COUNT_TIMEOUT)
+        return count
+
+
+class CachedCountPagination(CustomPageNumberPagination):
+    """Пагинация без COUNT(*) на каждый запрос.
+
+    Число записей берётся из кэша по ключу (фильтр, пользователь) и
+    сбрасывается при записи в таблицы запроса. Для списков без фильтров
+    на больших таблицах используется оценка планировщика, о чём говорит
+    поле count_exact в ответе.
+    """
+
+    django_paginator_class = CachedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.page.paginator.count,
+            "count_exact": self.page.paginator.count_exact,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_exact"] = {"type": "boolean"}
+        return response_schema
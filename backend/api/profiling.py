@@ -0,0 +1,50 @@
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+
+
+def profile_dir():
+    path = Path(settings.PROFILING_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def save_profile(profiler, meta):
+    """Пишет <id>.prof и <id>.json, старые профили удаляются"""
+    directory = profile_dir()
+    profile_id = f"{time.time_ns()}-{meta.pop('pid')}"
+    meta.update(
+        id=profile_id,
+        created=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    )
+    profiler.dump_stats(directory / f"{profile_id}.prof")
+    (directory / f"{profile_id}.json").write_text(json.dumps(meta))
+
+    profiles = sorted(directory.glob("*.prof"))
+    for path in profiles[:-settings.PROFILING_MAX_FILES]:
+        path.unlink(missing_ok=True)
+        path.with_suffix(".json").unlink(missing_ok=True)
+    return profile_id
+
+
+def list_profiles():
+    profiles = []
+    for path in profile_dir().glob("*.json"):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            # Файл удалён ротацией или ещё дописывается
+            continue
+    return profiles
+
+
+def profile_path(profile_id):
+    """Путь к .prof по id или None для чужих имён"""
+    name, _, pid = profile_id.partition("-")
+    if not (name.isdigit() and pid.isdigit()):
+        return None
+    path = profile_dir() / f"{profile_id}.prof"
+    return path if path.exists() else None
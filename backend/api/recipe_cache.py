@@ -0,0 +1,158 @@
+import marshal
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from recipes.models import Recipe, RecipeIngredient
+from api.relations import get_relations
+
+
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 0.5
+LOCK_POLL = 0.02
+
+# Поля автора в карточке рецепта: их изменение сбрасывает кэш рецептов
+AUTHOR_FIELDS = ("username", "first_name", "last_name", "email", "avatar")
+
+
+def recipe_cache_key(recipe_id):
+    return f"recipe:payload:{recipe_id}"
+
+
+def invalidate_recipes(recipe_ids):
+    cache.delete_many([recipe_cache_key(pk) for pk in recipe_ids])
+
+
+def recipe_payload(recipe):
+    """Общая для всех пользователей часть карточки рецепта.
+
+    Единственное место, где собирается формат RecipeDetailsSerializer;
+    у recipe должны быть загружены author и recipeingredient_set.
+    """
+    author = recipe.author
+    return {
+        "id": recipe.id,
+        "author": {
+            "id": author.id,
+            "username": author.username,
+            "first_name": author.first_name,
+            "last_name": author.last_name,
+            "email": author.email,
+            "avatar": author.avatar.url if author.avatar else None,
+        },
+        "ingredients": [
+            {
+                "id": item.ingredient.id,
+                "name": item.ingredient.name,
+                "measurement_unit": item.ingredient.measurement_unit,
+                "amount": item.amount,
+            }
+            for item in recipe.recipeingredient_set.all()
+        ],
+        "name": recipe.title,
+        "image": recipe.image.url if recipe.image else None,
+        "text": recipe.description,
+        "cooking_time": recipe.preparation_time,
+    }
+
+
+def build_payloads(recipe_ids):
+    recipes = Recipe.objects.filter(id__in=recipe_ids).select_related(
+        "author"
+    ).prefetch_related(
+        Prefetch(
+            "recipeingredient_set",
+            queryset=RecipeIngredient.objects.select_related("ingredient")
+            .order_by("id"),
+        )
+    )
+    return {recipe.id: recipe_payload(recipe) for recipe in recipes}
+
+
+def store_payloads(payloads):
+    cache.set_many(
+        {recipe_cache_key(pk): marshal.dumps(payload)
+         for pk, payload in payloads.items()},
+        settings.RECIPE_CACHE_TIMEOUT,
+    )
+
+
+def load_cached(recipe_ids):
+    cached = cache.get_many([recipe_cache_key(pk) for pk in recipe_ids])
+    return {
+        pk: marshal.loads(cached[recipe_cache_key(pk)])
+        for pk in recipe_ids if recipe_cache_key(pk) in cached
+    }
+
+
+def get_recipe_payloads(recipe_ids):
+    """Payload рецептов из кэша, промахи собираются одним проходом.
+
+    Промах по каждому рецепту собирает только процесс, взявший его
+    блокировку, остальные недолго ждут готовую запись.
+    """
+    payloads = load_cached(recipe_ids)
+    missing = [pk for pk in recipe_ids if pk not in payloads]
+    if not missing:
+        return payloads
+
+    owned = [pk for pk in missing
+             if cache.add(f"{recipe_cache_key(pk)}:lock", 1, LOCK_TIMEOUT)]
+    waiting = [pk for pk in missing if pk not in owned]
+    try:
+        if owned:
+            built = build_payloads(owned)
+            store_payloads(built)
+            payloads.update(built)
+        deadline = time.monotonic() + LOCK_WAIT
+        while waiting and time.monotonic() < deadline:
+            time.sleep(LOCK_POLL)
+            ready = load_cached(waiting)
+            payloads.update(ready)
+            waiting = [pk for pk in waiting if pk not in ready]
+        if waiting:
+            payloads.update(build_payloads(waiting))
+    finally:
+        cache.delete_many([f"{recipe_cache_key(pk)}:lock" for pk in owned])
+    return payloads
+
+
+def personalize(payloads, request, relations=None):
+    """Добавляет поля текущего пользователя и абсолютные URL.
+
+    relations по умолчанию берётся из get_relations(request); асинхронные
+    представления передают свой, чтобы не трогать request.user.
+    """
+    if relations is None:
+        relations = get_relations(request)
+    favorites = relations.favorite_ids
+    carts = relations.cart_ids
+    following = relations.following_ids
+
+    def absolute(url):
+        return request.build_absolute_uri(url) if url else None
+
+    results = []
+    for payload in payloads:
+        author = payload["author"]
+        results.append({
+            "id": payload["id"],
+            "author": {
+                "id": author["id"],
+                "username": author["username"],
+                "first_name": author["first_name"],
+                "last_name": author["last_name"],
+                "email": author["email"],
+                "is_subscribed": author["id"] in following,
+                "avatar": absolute(author["avatar"]),
+            },
+            "ingredients": payload["ingredients"],
+            "is_favorited": payload["id"] in favorites,
+            "is_in_shopping_cart": payload["id"] in carts,
+            "name": payload["name"],
+            "image": absolute(payload["image"]),
+            "text": payload["text"],
+            "cooking_time": payload["cooking_time"],
+        })
+    return results
@@ -0,0 +1,52 @@
+from django.utils.functional import cached_property
+from users.models import Follow
+from recipes.models import Favorite, ShoppingCart
+
+
+class ViewerRelations:
+    """Подписки, избранное и корзина текущего пользователя.
+
+    Каждое множество загружается одним запросом при первом обращении и
+    живёт до конца HTTP-запроса.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def ids(self, queryset, field):
+        if not self.user.is_authenticated:
+            return frozenset()
+        return frozenset(queryset.filter(user=self.user).values_list(
+            field, flat=True))
+
+    @cached_property
+    def following_ids(self):
+        return self.ids(Follow.objects, "author_id")
+
+    @cached_property
+    def favorite_ids(self):
+        return self.ids(Favorite.objects, "recipe_id")
+
+    @cached_property
+    def cart_ids(self):
+        return self.ids(ShoppingCart.objects, "recipe_id")
+
+    def is_subscribed(self, author):
+        return author.pk in self.following_ids
+
+    def is_favorited(self, recipe):
+        return recipe.pk in self.favorite_ids
+
+    def is_in_shopping_cart(self, recipe):
+        return recipe.pk in self.cart_ids
+
+
+def get_relations(request):
+    """ViewerRelations, общий для DRF-представления и его сериализаторов"""
+    http_request = getattr(request, "_request", request)
+    relations = getattr(http_request, "viewer_relations", None)
+    # request.user у DRF может смениться после аутентификации по токену
+    if relations is None or relations.user != request.user:
+        relations = ViewerRelations(request.user)
+        http_request.viewer_relations = relations
+    return relations
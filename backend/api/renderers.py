@@ -0,0 +1,41 @@
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z if orjson else 0
+)
+
+# Decimal, ленивые строки перевода, timedelta и прочее, что orjson не
+# умеет сам, приводятся так же, как в стандартном рендерере DRF
+default = encoders.JSONEncoder().default
+
+
+def dumps(data):
+    """Компактный JSON в байтах: orjson, если он установлен"""
+    content = orjson.dumps(data, default=default, option=ORJSON_OPTIONS)
+    # Как и DRF, экранируем разделители строк для вставки в JavaScript
+    if b"\xe2\x80\xa8" in content or b"\xe2\x80\xa9" in content:
+        content = content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029")
+    return content
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson с откатом на стандартный json"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
@@ -1,12 +1,15 @@
 from rest_framework import serializers
-from django.core.files.base import ContentFile
-import base64
-import uuid
+from django.conf import settings
 from django.core.validators import MinValueValidator
 from users.models import User, Follow
 from recipes.models import (Recipe, Ingredient, RecipeIngredient, Favorite,
                             ShoppingCart)
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models import Prefetch, prefetch_related_objects
+from api.images import ImageError, check_image, downscale, image_from_data_url
+from api.cache import bump_table_version
+from api.recipe_cache import invalidate_recipes, personalize, recipe_payload
+from api.relations import get_relations
 
 
 MIN_VALUE_FOR_VALIDATOR = 1
@@ -14,14 +17,24 @@ MAX_VALUE_FOR_VALIDATOR = 32000
 
 
 class Base64ImageField(serializers.ImageField):
+    """Изображение из data URL или файла; resize_to уменьшает до квадрата"""
+
+    def __init__(self, *args, resize_to=None, **kwargs):
+        self.resize_to = resize_to
+        super().__init__(*args, **kwargs)
+
     def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith("data:image"):
-            format, imgstr = data.split(";base64,")
-            ext = format.split("/")[-1]
-            img_data = base64.b64decode(imgstr)
-            file_name = f"{uuid.uuid4()}.{ext}"
-            return ContentFile(img_data, name=file_name)
-        return super().to_internal_value(data)
+        try:
+            if isinstance(data, str) and data.startswith("data:image"):
+                image = image_from_data_url(data)
+            else:
+                image = super().to_internal_value(data)
+                check_image(image)
+            if self.resize_to:
+                image = downscale(image, self.resize_to)
+        except ImageError as error:
+            raise serializers.ValidationError(str(error))
+        return image
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -29,6 +42,7 @@ class UserCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = User
+        ref_name = "FoodgramUserCreate"
         fields = ["id", "email", "username", "first_name", "last_name",
                   "password"]
 
@@ -54,12 +68,14 @@ class RecipeShortSerializer(serializers.ModelSerializer):
 
 class UserSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
-    avatar = Base64ImageField(required=False, allow_null=True)
+    avatar = Base64ImageField(required=False, allow_null=True,
+                              resize_to=settings.AVATAR_SIZE)
     recipes = serializers.SerializerMethodField()
     recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
+        ref_name = "FoodgramUser"
         fields = [
             "id",
             "username",
@@ -75,19 +91,18 @@ class UserSerializer(serializers.ModelSerializer):
                             "recipes_count"]
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         request = self.context.get("request")
-        if request and request.user.is_authenticated:
-            return (
-                request.user.is_authenticated
-                and request.user.following.filter(author=obj).exists()
-            )
+        if request:
+            return get_relations(request).is_subscribed(obj)
         return False
 
     def get_recipes(self, obj):
         request = self.context.get("request")
         if request and request.user.is_authenticated:
             recipes_limit = request.query_params.get("recipes_limit")
-            recipes = obj.recipes.all()
+            recipes = obj.recipes.order_by("-date_created")
 
             if recipes_limit and recipes_limit.isdigit():
                 recipes = recipes[: int(recipes_limit)]
@@ -102,6 +117,8 @@ class UserSerializer(serializers.ModelSerializer):
             self.context.get("request")
             and self.context["request"].user.is_authenticated
         ):
+            if hasattr(obj, "recipes_count"):
+                return obj.recipes_count
             return obj.recipes.count()
         return 0
 
@@ -115,14 +132,20 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class UserListSerializer(serializers.ModelSerializer):
-    avatar = Base64ImageField(required=False, allow_null=True)
+    is_subscribed = serializers.SerializerMethodField()
+    avatar = Base64ImageField(required=False, allow_null=True,
+                              resize_to=settings.AVATAR_SIZE)
 
     class Meta:
         model = User
         fields = ["id", "username", "first_name", "last_name", "email",
-                  "avatar"]
+                  "is_subscribed", "avatar"]
         read_only_fields = fields
 
+    def get_is_subscribed(self, obj):
+        """Берётся из аннотации queryset UserViewSet"""
+        return getattr(obj, "is_subscribed", False)
+
 
 class AvatarResponseSerializer(serializers.Serializer):
     avatar = serializers.CharField()
@@ -132,14 +155,19 @@ class AvatarResponseSerializer(serializers.Serializer):
 
 
 class UserPublicSerializer(serializers.ModelSerializer):
-    avatar = Base64ImageField(required=False, allow_null=True)
+    is_subscribed = serializers.SerializerMethodField()
+    avatar = Base64ImageField(required=False, allow_null=True,
+                              resize_to=settings.AVATAR_SIZE)
 
     class Meta:
         model = User
         fields = ["id", "username", "first_name", "last_name", "email",
-                  "avatar"]
+                  "is_subscribed", "avatar"]
         read_only_fields = fields
 
+    def get_is_subscribed(self, obj):
+        return False
+
 
 class IngredientAmountSerializer(serializers.Serializer):
     id = serializers.IntegerField()
@@ -147,12 +175,6 @@ class IngredientAmountSerializer(serializers.Serializer):
         MinValueValidator(MIN_VALUE_FOR_VALIDATOR),
         MaxValueValidator(MAX_VALUE_FOR_VALIDATOR),])
 
-    def validate_id(self, value):
-        if not Ingredient.objects.filter(id=value).exists():
-            raise serializers.ValidationError(
-                "Ингредиент с таким ID не существует.")
-        return value
-
 
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
@@ -219,16 +241,23 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                     "Ингредиенты не должны повторяться."
                 )
             seen_ids.add(ingredient_id)
+
+        # Все ингредиенты проверяются одним запросом, найденные объекты
+        # используются при записи в create_update_recipes
+        ingredients = Ingredient.objects.in_bulk(seen_ids)
+        missing = sorted(seen_ids - ingredients.keys())
+        if missing:
+            raise serializers.ValidationError(
+                "Ингредиенты с такими ID не существуют: "
+                + ", ".join(map(str, missing)))
+        for item in value:
+            item["ingredient"] = ingredients[item["id"]]
         return value
 
     def create_update_recipes(self, recipe, ingredients_data):
-        ingredient_ids = [item['id'] for item in ingredients_data]
-        ingredients = Ingredient.objects.in_bulk(ingredient_ids,
-                                                 field_name='id')
-
         recipe_ingredients = []
         for item in ingredients_data:
-            ingredient = ingredients.get(item['id'])
+            ingredient = item['ingredient']
             recipe_ingredients.append(
                 RecipeIngredient(
                     recipe=recipe,
@@ -239,12 +268,19 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             )
 
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        # bulk_create не отправляет сигналы
+        bump_table_version(RecipeIngredient._meta.db_table)
+        invalidate_recipes([recipe.id])
         return recipe
 
     def create(self, validated_data):
         ingredients_data = validated_data.pop("ingredients", [])
         author = self.context["request"].user
-        recipe = Recipe(author=author, **validated_data)
+        recipe = Recipe(
+            author=author,
+            ingredient_ids=sorted(item["id"] for item in ingredients_data),
+            **validated_data
+        )
         recipe.full_clean()
         recipe.save()
 
@@ -255,14 +291,59 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
+        update_fields = list(validated_data)
+        ingredient_ids = sorted(item["id"] for item in ingredients_data)
+        if ingredient_ids != instance.ingredient_ids:
+            instance.ingredient_ids = ingredient_ids
+            update_fields.append("ingredient_ids")
 
         instance.full_clean()
-        instance.save()
-
-        instance.recipeingredient_set.all().delete()
-        return self.create_update_recipes(instance, ingredients_data)
+        if update_fields:
+            instance.save(update_fields=update_fields)
+
+        self.update_recipe_ingredients(instance, ingredients_data)
+        return instance
+
+    def update_recipe_ingredients(self, recipe, ingredients_data):
+        """Меняет только отличающиеся строки RecipeIngredient"""
+        existing = {
+            ingredient_id: (pk, amount)
+            for pk, ingredient_id, amount in recipe.recipeingredient_set
+            .values_list("id", "ingredient_id", "amount")
+        }
+        amounts = {item["id"]: item["amount"] for item in ingredients_data}
+
+        removed = [pk for ingredient_id, (pk, _) in existing.items()
+                   if ingredient_id not in amounts]
+        changed = [
+            RecipeIngredient(id=existing[ingredient_id][0], amount=amount)
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id in existing
+            and existing[ingredient_id][1] != amount
+        ]
+        added = [item for item in ingredients_data
+                 if item["id"] not in existing]
+
+        if removed:
+            # Одним запросом без сигналов на каждую строку: ingredient_ids
+            # уже записан в update(), версия таблицы и карточка
+            # сбрасываются ниже
+            RecipeIngredient.objects.filter(id__in=removed)._raw_delete(
+                RecipeIngredient.objects.db)
+            bump_table_version(RecipeIngredient._meta.db_table)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ["amount"])
+        if added:
+            self.create_update_recipes(recipe, added)
+        elif removed or changed:
+            invalidate_recipes([recipe.id])
 
     def to_representation(self, instance):
+        prefetch_related_objects([instance], Prefetch(
+            "recipeingredient_set",
+            queryset=RecipeIngredient.objects.select_related("ingredient")
+            .order_by("id"),
+        ))
         return RecipeDetailsSerializer(instance, context=self.context).data
 
 
@@ -284,9 +365,9 @@ class UserShortSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
+        if not request:
             return False
-        return obj.followers.filter(user=request.user).exists()
+        return get_relations(request).is_subscribed(obj)
 
     def get_avatar(self, obj):
         request = self.context.get('request')
@@ -307,18 +388,20 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
 
 
 class RecipeDetailsSerializer(serializers.ModelSerializer):
+    """Поля описывают схему API, сам ответ собирает recipe_payload"""
+
     author = UserShortSerializer(read_only=True)
     ingredients = IngredientInRecipeSerializer(
         source='recipeingredient_set', 
         many=True,
         read_only=True
     )
-    is_favorited = serializers.SerializerMethodField()
-    is_in_shopping_cart = serializers.SerializerMethodField()
+    is_favorited = serializers.BooleanField(read_only=True)
+    is_in_shopping_cart = serializers.BooleanField(read_only=True)
     name = serializers.CharField(source="title")
     text = serializers.CharField(source="description")
     cooking_time = serializers.IntegerField(source="preparation_time")
-    image = serializers.SerializerMethodField()
+    image = serializers.ImageField(read_only=True)
 
     class Meta:
         model = Recipe
@@ -334,35 +417,9 @@ class RecipeDetailsSerializer(serializers.ModelSerializer):
             "cooking_time",
         ]
 
-    def get_is_favorited(self, obj):
-        user = self.context["request"].user
-        if not user.is_authenticated:
-            return False
-        return obj.in_favorites.filter(user=user).exists()
-
-    def get_is_in_shopping_cart(self, obj):
-        user = self.context["request"].user
-        if not user.is_authenticated:
-            return False
-        return obj.in_shopping_carts.filter(user=user).exists()
-
-    def get_image(self, obj):
-        request = self.context.get("request")
-        if obj.image and hasattr(obj.image, "url"):
-            return request.build_absolute_uri(obj.image.url)
-        return None
-
-    def _get_is_subscribed(self, author):
-        request = self.context.get("request")
-        if not request or not request.user.is_authenticated:
-            return False
-        return request.user.following.filter(author=author).exists()
-
-    def _get_avatar_url(self, user):
-        request = self.context.get("request")
-        if user.avatar and hasattr(user.avatar, "url"):
-            return request.build_absolute_uri(user.avatar.url)
-        return None
+    def to_representation(self, instance):
+        return personalize([recipe_payload(instance)],
+                           self.context["request"])[0]
 
 
 class RecipeSummarySerializer(serializers.ModelSerializer):
@@ -429,7 +486,7 @@ class FollowSerializer(serializers.ModelSerializer):
         if user == author:
             raise serializers.ValidationError(
                 "Нельзя подписаться на самого себя.")
-        if user.following.filter(author=author).exists():
+        if get_relations(self.context["request"]).is_subscribed(author):
             raise serializers.ValidationError(
                 "Вы уже подписаны на этого пользователя.")
 
@@ -445,8 +502,12 @@ class FollowSerializer(serializers.ModelSerializer):
         return True
 
     def get_recipes(self, obj) -> list:
+        if hasattr(obj.author, "preview_recipes"):
+            return RecipeShortSerializer(obj.author.preview_recipes,
+                                         many=True, context=self.context).data
+
         request = self.context.get("request")
-        recipes = obj.author.recipes.all()
+        recipes = obj.author.recipes.order_by("-date_created")
 
         if not request:
             return RecipeShortSerializer(recipes, many=True,
@@ -463,6 +524,8 @@ class FollowSerializer(serializers.ModelSerializer):
         return serializer.data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, "recipes_count"):
+            return obj.recipes_count
         return obj.author.recipes.count()
 
 
@@ -479,7 +542,8 @@ class SetPasswordSerializer(serializers.Serializer):
 
 class UserProfileNoAuthSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
-    avatar = Base64ImageField(required=False, allow_null=True)
+    avatar = Base64ImageField(required=False, allow_null=True,
+                              resize_to=settings.AVATAR_SIZE)
 
     class Meta:
         model = User
@@ -495,4 +559,5 @@ class UserProfileNoAuthSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
     def get_is_subscribed(self, obj):
-        return False
+        """Берётся из аннотации queryset UserViewSet"""
+        return getattr(obj, "is_subscribed", False)
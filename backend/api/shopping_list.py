@@ -0,0 +1,125 @@
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Sum
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from recipes.models import RecipeIngredient
+
+
+# Меняется вместе с оформлением PDF, чтобы не отдавать старые файлы
+LAYOUT_VERSION = 1
+
+FONT = "ShoppingListFont"
+FONT_SIZE = 11
+TITLE_SIZE = 16
+LINE_HEIGHT = 6 * mm
+MARGIN = 20 * mm
+
+
+def cart_ingredients(user):
+    """Суммарное количество каждого ингредиента из корзины пользователя"""
+    return (
+        RecipeIngredient.objects.filter(
+            recipe_id__in=user.shopping_carts.values("recipe_id"))
+        .values_list("ingredient__name", "ingredient__measurement_unit")
+        .annotate(total_amount=Sum("amount"))
+        .order_by("ingredient__name")
+    )
+
+
+def cart_digest(rows):
+    """Хэш содержимого списка покупок"""
+    digest = hashlib.sha256(f"v{LAYOUT_VERSION}".encode())
+    for row in rows:
+        digest.update(repr(row).encode())
+    return digest.hexdigest()[:32]
+
+
+@lru_cache(maxsize=None)
+def register_font():
+    pdfmetrics.registerFont(TTFont(FONT, settings.SHOPPING_LIST_FONT))
+
+
+def write_pdf(rows, path):
+    """Рисует список постранично сразу в файл, не собирая его в памяти"""
+    register_font()
+    width, height = A4
+    text_width = width - 2 * MARGIN
+    pdf = canvas.Canvas(str(path), pagesize=A4, pageCompression=1)
+    pdf.setTitle("Список покупок")
+    pdf.setFont(FONT, TITLE_SIZE)
+    pdf.drawString(MARGIN, height - MARGIN, "Список покупок")
+    y = height - MARGIN - 2 * LINE_HEIGHT
+    pdf.setFont(FONT, FONT_SIZE)
+    for number, (name, unit, amount) in enumerate(rows, 1):
+        lines = simpleSplit(f"{number}. {name} — {amount} {unit}", FONT,
+                            FONT_SIZE, text_width)
+        if y - LINE_HEIGHT * (len(lines) - 1) < MARGIN:
+            pdf.showPage()
+            pdf.setFont(FONT, FONT_SIZE)
+            y = height - MARGIN
+        for line in lines:
+            pdf.drawString(MARGIN, y, line)
+            y -= LINE_HEIGHT
+    pdf.save()
+
+
+def cache_dir():
+    path = Path(settings.SHOPPING_LIST_CACHE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def prune_cache(directory):
+    """Оставляет SHOPPING_LIST_CACHE_MAX_FILES последних по времени файлов"""
+    files = sorted(directory.glob("*.pdf"), key=lambda path: path.stat(
+    ).st_mtime)
+    for path in files[:-settings.SHOPPING_LIST_CACHE_MAX_FILES]:
+        path.unlink(missing_ok=True)
+
+
+def pdf_path(rows):
+    """Путь PDF в дисковом кэше.
+
+    Ключ — хэш самого списка, поэтому одинаковые корзины делят файл, а
+    изменение рецепта в корзине даёт новый ключ.
+    """
+    return cache_dir() / f"{cart_digest(rows)}.pdf"
+
+
+def cached_pdf(rows):
+    """Готовый PDF списка или None, если его ещё не нарисовали"""
+    path = pdf_path(rows)
+    if not path.exists():
+        return None
+    # Часто скачиваемые файлы переживают очистку
+    os.utime(path)
+    return path
+
+
+def shopping_list_pdf(user):
+    """PDF списка покупок из дискового кэша, при промахе рисуется заново"""
+    rows = list(cart_ingredients(user))
+    path = cached_pdf(rows)
+    if path is not None:
+        return path
+
+    path = pdf_path(rows)
+    descriptor, temp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(descriptor)
+    try:
+        write_pdf(rows, temp_name)
+        os.replace(temp_name, path)
+    finally:
+        Path(temp_name).unlink(missing_ok=True)
+    prune_cache(path.parent)
+    return path
@@ -0,0 +1,70 @@
+import secrets
+import string
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from recipes.models import Recipe, ShortLink
+
+
+ALPHABET = string.digits + string.ascii_letters
+CODE_LENGTH = 6
+MAX_CODE_LENGTH = 16
+RESOLVE_TIMEOUT = 24 * 60 * 60
+
+
+def encode_base62(number):
+    code = ""
+    while True:
+        number, remainder = divmod(number, len(ALPHABET))
+        code = ALPHABET[remainder] + code
+        if not number:
+            return code
+
+
+def new_code():
+    return encode_base62(
+        secrets.randbelow(len(ALPHABET) ** CODE_LENGTH)
+    ).rjust(CODE_LENGTH, ALPHABET[0])
+
+
+def get_or_create_code(recipe_id, attempts=5):
+    """Код ссылки рецепта, создаётся при первом запросе"""
+    code = ShortLink.objects.filter(recipe_id=recipe_id).values_list(
+        "code", flat=True).first()
+    if code is not None:
+        return code
+    for _ in range(attempts):
+        try:
+            with transaction.atomic():
+                return ShortLink.objects.create(recipe_id=recipe_id,
+                                                code=new_code()).code
+        except IntegrityError:
+            code = ShortLink.objects.filter(recipe_id=recipe_id).values_list(
+                "code", flat=True).first()
+            if code is not None:
+                return code
+            if not Recipe.objects.filter(pk=recipe_id).exists():
+                raise Recipe.DoesNotExist
+    raise IntegrityError("Не удалось подобрать свободный код ссылки")
+
+
+def code_cache_key(code):
+    return f"short_link:{code}"
+
+
+def resolve_code(code):
+    """ID рецепта по коду; промахи не кэшируются.
+
+    Ключ удаляется при удалении ссылки, в том числе вместе с рецептом.
+    """
+    if len(code) > MAX_CODE_LENGTH or not all(
+        char in ALPHABET for char in code
+    ):
+        raise ShortLink.DoesNotExist
+    key = code_cache_key(code)
+    recipe_id = cache.get(key)
+    if recipe_id is None:
+        recipe_id = ShortLink.objects.values_list(
+            "recipe_id", flat=True).get(code=code)
+        cache.set(key, recipe_id, RESOLVE_TIMEOUT)
+    return recipe_id
@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from users.models import User, Follow
+from recipes.models import (Recipe, Ingredient, RecipeIngredient, Favorite,
+                            ShoppingCart, ShortLink)
+from api.cache import bump_table_version
+from api.cart import forget_cart_count
+from api.catalog import catalog_changed
+from api.recipe_cache import AUTHOR_FIELDS, invalidate_recipes
+from api.short_links import code_cache_key
+
+
+# Записи в таблицы этих моделей сбрасывают закэшированные счётчики
+# CachedCountPaginator; запросы по другим таблицам считаются без кэша
+COUNTED_MODELS = (User, Follow, Recipe, Ingredient, RecipeIngredient,
+                  Favorite, ShoppingCart)
+
+
+def invalidate_counts(sender, **kwargs):
+    bump_table_version(sender._meta.db_table)
+
+
+for model in COUNTED_MODELS:
+    post_save.connect(invalidate_counts, sender=model,
+                      dispatch_uid=f"counts_{model._meta.label}")
+    post_delete.connect(invalidate_counts, sender=model,
+                        dispatch_uid=f"counts_delete_{model._meta.label}")
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    invalidate_recipes([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+def invalidate_recipe_ingredients(sender, instance, **kwargs):
+    # Строки меняются и мимо API: в админке и каскадом при удалении
+    # ингредиента. Сам рецепт не загружается, он мог быть уже удалён
+    Recipe(pk=instance.recipe_id).refresh_ingredient_ids()
+    # ingredient_ids обновляется через update() без сигналов Recipe
+    bump_table_version(Recipe._meta.db_table)
+    invalidate_recipes([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def invalidate_ingredient_recipes(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_recipes(RecipeIngredient.objects.filter(
+            ingredient=instance).values_list("recipe_id", flat=True))
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_catalog(sender, **kwargs):
+    catalog_changed()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipes(sender, instance, created, update_fields,
+                              **kwargs):
+    # Вход сохраняет только last_login, карточки рецептов он не меняет
+    if created or (update_fields is not None
+                   and not update_fields & set(AUTHOR_FIELDS)):
+        return
+    invalidate_recipes(instance.recipes.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_cart_count(sender, instance, **kwargs):
+    forget_cart_count(instance.user_id)
+
+
+@receiver(post_delete, sender=ShortLink)
+def forget_short_link(sender, instance, **kwargs):
+    cache.delete(code_cache_key(instance.code))
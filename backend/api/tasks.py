@@ -0,0 +1,9 @@
+from jobs.queue import task
+from users.models import User
+from api.shopping_list import shopping_list_pdf
+
+
+@task(unique=True)
+def render_shopping_list(user_id):
+    """Рисует PDF списка покупок пользователя в дисковый кэш"""
+    shopping_list_pdf(User(pk=user_id))
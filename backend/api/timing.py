@@ -0,0 +1,103 @@
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+
+_current = ContextVar("server_timing", default=None)
+
+
+class ServerTiming:
+    """Длительности фаз запроса для заголовка Server-Timing"""
+
+    def __init__(self, query_stats):
+        self.query_stats = query_stats
+        self.started = time.perf_counter()
+        self.cache = 0.0
+        self.phases = {}
+
+    @property
+    def db(self):
+        return self.query_stats.duration if self.query_stats else 0.0
+
+    def mark(self):
+        return time.perf_counter(), self.db, self.cache
+
+    def elapsed_own(self, mark):
+        """Время с отметки mark без SQL и кэша"""
+        started, db, cache = mark
+        return (time.perf_counter() - started - (self.db - db)
+                - (self.cache - cache))
+
+    def header(self):
+        queries = self.query_stats.count if self.query_stats else 0
+        total = time.perf_counter() - self.started
+        parts = [f'db;dur={self.db * 1000:.1f};desc="{queries} queries"',
+                 f"cache;dur={self.cache * 1000:.1f}"]
+        parts += [f"{name};dur={seconds * 1000:.1f}"
+                  for name, seconds in self.phases.items()]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def start_timing(query_stats):
+    """Начинает замер запроса, возвращает его и токен для stop_timing"""
+    timing = ServerTiming(query_stats)
+    return timing, _current.set(timing)
+
+
+def stop_timing(token):
+    _current.reset(token)
+
+
+def timed_cache_method(method):
+    """Добавляет время вызова метода кэша в фазу cache текущего замера"""
+
+    @wraps(method)
+    def timed(*args, **kwargs):
+        timing = _current.get()
+        if timing is None:
+            return method(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timing.cache += time.perf_counter() - started
+
+    return timed
+
+
+class ServerTimingMixin:
+    """Фазы auth, serialize и render viewset'а для Server-Timing.
+
+    Заголовок ставит ServerTimingMiddleware, здесь замер только дополняется
+    фазами DRF. Фазы указаны без SQL и кэша.
+    """
+
+    handler_mark = None
+
+    def initial(self, request, *args, **kwargs):
+        timing = _current.get()
+        if timing is None:
+            return super().initial(request, *args, **kwargs)
+        mark = timing.mark()
+        super().initial(request, *args, **kwargs)
+        timing.phases["auth"] = timing.elapsed_own(mark)
+        self.handler_mark = timing.mark()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        timing = _current.get()
+        if timing is None or self.handler_mark is None:
+            return response
+        timing.phases["serialize"] = timing.elapsed_own(self.handler_mark)
+        if getattr(response, "is_rendered", True):
+            return response
+
+        render_mark = timing.mark()
+
+        def record_render(rendered):
+            timing.phases["render"] = timing.elapsed_own(render_mark)
+
+        response.add_post_render_callback(record_render)
+        return response
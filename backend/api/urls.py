@@ -1,4 +1,5 @@
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
 from api.views import UserViewSet
 from api.views import (
@@ -15,6 +16,9 @@ from api.views import (
     CreateRecipeView,
     EditRecipeView,
     PasswordChangeView,
+    CacheStatsView,
+    schema,
+    swagger_ui,
 )
 
 
@@ -23,10 +27,25 @@ router.register(r"users", UserViewSet, basename="users")
 router.register(r"ingredients", IngredientViewSet, basename="ingredients")
 router.register(r"recipes", RecipeViewSet, basename="recipes")
 
-urlpatterns = [
+urlpatterns = []
+
+if settings.ASYNC_API:
+    from api import async_views
+
+    urlpatterns += [
+        path("recipes/", async_views.recipe_list_view),
+        path("recipes/<int:pk>/", async_views.recipe_detail_view),
+        path("ingredients/", async_views.ingredient_list_view),
+        path("users/subscriptions/", async_views.subscriptions_view),
+    ]
+
+urlpatterns += [
     path("auth/", include("djoser.urls")),
     path("auth/", include("djoser.urls.authtoken")),
     path("", include(router.urls)),
+    path("cache/stats/", CacheStatsView.as_view(), name="cache_stats"),
+    re_path(r"^schema(?P<format>\.json|\.yaml)$", schema, name="schema"),
+    path("schema/", swagger_ui, name="swagger_ui"),
     path("signup/", SignUpView.as_view(), name="signup"),
     path("login/", LoginView.as_view(), name="login"),
     path("logout/", LogoutView.as_view(), name="logout"),
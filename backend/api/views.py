@@ -1,21 +1,28 @@
+import os
+
+from django.conf import settings
+
 from rest_framework import viewsets, status, views, serializers
 from django.contrib.auth import authenticate, login, logout
 from api.serializers import Base64ImageField
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from django.views import View
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth.mixins import LoginRequiredMixin
 from rest_framework.filters import SearchFilter
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import Count, Exists, OuterRef, Prefetch
+from django.contrib import admin
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseForbidden, StreamingHttpResponse)
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from rest_framework.views import APIView
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from django.shortcuts import render, redirect, get_object_or_404
 from users.models import User, Follow
-from recipes.models import (Recipe, Ingredient, RecipeIngredient, Favorite,
-                            ShoppingCart)
+from recipes.models import (Recipe, Ingredient, Favorite, ShoppingCart,
+                            ShortLink)
 from api.serializers import (
     UserCreateSerializer,
     UserSerializer,
@@ -32,9 +39,22 @@ from api.serializers import (
     FollowSerializer,
     AvatarResponseSerializer,
 )
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.parsers import MultiPartParser, FormParser
 from api.filters import RecipeFilter, IngredientFilter
-from api.pagination import CustomPageNumberPagination
+from api.parsers import FastJSONParser
+from api.pagination import CachedCountPagination, FeedCursorPagination
+from api.cache import cache_stats
+from api.cart import get_cart_count
+from api.catalog import catalog_response, catalog_snapshot, render_catalog
+from api.recipe_cache import get_recipe_payloads, personalize
+from api.metrics import get_registry, metrics_allowed
+from api.profiling import list_profiles, profile_path
+from api.relations import get_relations
+from api.short_links import get_or_create_code, resolve_code
+from api.shopping_list import cart_ingredients, cached_pdf
+from api.tasks import render_shopping_list
+from api.timing import ServerTimingMixin
+from recipes.feed import get_feed_queryset
 from api.permissions import IsOwnerOrReadOnly
 from django.views.generic.edit import CreateView, UpdateView
 from django.views.generic.detail import DetailView
@@ -106,13 +126,11 @@ class UserProfileView(DetailView):
         profile_user = self.get_object()
         user = self.request.user
 
-        context["recipes"] = profile_user.recipes.all()
+        context["recipes"] = profile_user.recipes.order_by("-date_created")
         context["can_follow"] = (user.is_authenticated and
                                  user.id != profile_user.id)
-        context["is_following"] = (
-            user.is_authenticated
-            and user.following.filter(author=profile_user).exists()
-        )
+        context["is_following"] = get_relations(
+            self.request).is_subscribed(profile_user)
         return context
 
 
@@ -121,11 +139,6 @@ class RecipeDetailView(DetailView):
     template_name = "recipe_detail.html"
     context_object_name = "recipe"
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context["cart_count"] = self.request.user.shopping_carts.count()
-        return context
-
 
 class SubscriptionsView(ListView):
     model = Follow
@@ -139,12 +152,13 @@ class SubscriptionsView(ListView):
 
 class FavoritesView(APIView):
     permission_classes = [IsAuthenticated]
-    pagination_class = CustomPageNumberPagination
+    pagination_class = CachedCountPagination
 
     def get(self, request):
         """Получить список избранных рецептов с пагинацией"""
         user = request.user
-        favorites = Recipe.objects.filter(in_favorites__user=user)
+        favorites = Recipe.objects.filter(
+            in_favorites__user=user).order_by("-date_created", "-id")
 
         paginator = self.pagination_class()
         page = paginator.paginate_queryset(favorites, request)
@@ -181,7 +195,7 @@ class FavoritesView(APIView):
         serializer = RecipeSummarySerializer(recipe, context={"request":
                                                               request})
         serializer_data = serializer.data
-        serializer_data["cart_count"] = self.request.user.shopping_carts.count()
+        serializer_data["cart_count"] = get_cart_count(request.user)
         return Response(serializer_data, status=status.HTTP_201_CREATED)
 
     def delete(self, request):
@@ -221,12 +235,8 @@ class ShoppingCartView(LoginRequiredMixin, View):
         """Обработка GET-запроса (просмотр корзины)"""
         cart_items = request.user.shopping_carts.select_related(
             "recipe"
-        ).all()
-        return render(
-            request,
-            self.template_name,
-            {"cart_items": cart_items, "cart_count": cart_items.count()},
-        )
+        ).order_by("-date_added")
+        return render(request, self.template_name, {"cart_items": cart_items})
 
     def post(self, request):
         """Обработка POST-запроса (добавление/удаление из корзины)"""
@@ -274,16 +284,7 @@ class CreateRecipeView(CreateView):
 
     def form_valid(self, form):
         form.instance.author = self.request.user
-        cart_count = self.request.user.shopping_carts.count()
-        return self.render_to_response(
-            self.get_context_data(cart_count=cart_count))
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context["cart_count"] = kwargs.get(
-            "cart_count", self.request.user.shopping_carts.count()
-        )
-        return context
+        return self.render_to_response(self.get_context_data())
 
 
 class EditRecipeView(UpdateView):
@@ -294,11 +295,6 @@ class EditRecipeView(UpdateView):
     success_url = reverse_lazy("recipe_list")
     permission_classes = [IsAuthenticated]
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context["cart_count"] = self.request.user.shopping_carts.count()
-        return context
-
     def get_object(self, queryset=None):
         obj = super().get_object(queryset)
         if obj.author != self.request.user and not self.request.user.is_staff:
@@ -312,10 +308,10 @@ class PasswordChangeView(AuthPasswordChangeView):
     permission_classes = [IsAuthenticated]
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ServerTimingMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     permission_classes = [AllowAny]
-    pagination_class = CustomPageNumberPagination
+    pagination_class = CachedCountPagination
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -328,6 +324,18 @@ class UserViewSet(viewsets.ModelViewSet):
             return UserProfileNoAuthSerializer
         return UserSerializer
 
+    def get_queryset(self):
+        """is_subscribed и recipes_count считаются в том же запросе"""
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(is_subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef("pk"))
+            ))
+        if "recipes_count" in self.get_serializer_class()._declared_fields:
+            queryset = queryset.annotate(recipes_count=Count("recipes"))
+        return queryset
+
     def list(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
             self.queryset = self.queryset.only(
@@ -363,7 +371,7 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     def retrieve(self, request, pk=None):
-        user = get_object_or_404(User, pk=pk)
+        user = self.get_object()
         serializer = self.get_serializer(user, context={"request": request})
         return Response(serializer.data)
 
@@ -372,7 +380,7 @@ class UserViewSet(viewsets.ModelViewSet):
         methods=["post", "patch", "put", "delete"],
         permission_classes=[IsAuthenticated],
         url_path="me/avatar",
-        parser_classes=[MultiPartParser, FormParser, JSONParser],
+        parser_classes=[MultiPartParser, FormParser, FastJSONParser],
     )
     def upload_avatar(self, request):
         user = request.user
@@ -384,24 +392,27 @@ class UserViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
+            field = Base64ImageField(resize_to=settings.AVATAR_SIZE)
             try:
-                user.avatar = Base64ImageField().to_internal_value(
-                    request.data["avatar"]
+                avatar = field.to_internal_value(request.data["avatar"])
+            except serializers.ValidationError as error:
+                return Response(
+                    {"error": error.detail[0]},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
-                user.save()
 
-                avatar_url = request.build_absolute_uri(user.avatar.url)
-                serializer = AvatarResponseSerializer(data={"avatar":
-                                                            avatar_url})
-                serializer.is_valid(raise_exception=True)
+            old_avatar = user.avatar.name
+            user.avatar = avatar
+            user.save(update_fields=["avatar"])
+            if old_avatar:
+                user.avatar.storage.delete(old_avatar)
 
-                return Response(serializer.data, status=status.HTTP_200_OK)
+            avatar_url = request.build_absolute_uri(user.avatar.url)
+            serializer = AvatarResponseSerializer(data={"avatar":
+                                                        avatar_url})
+            serializer.is_valid(raise_exception=True)
 
-            except Exception as e:
-                return Response(
-                    {"error": "Invalid image format"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+            return Response(serializer.data, status=status.HTTP_200_OK)
 
         elif request.method == "DELETE":
             if not user.avatar:
@@ -483,7 +494,18 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"], url_path="subscriptions")
     def subscriptions(self, request):
-        queryset = request.user.following.select_related("author")
+        recipes = Recipe.objects.order_by("-date_created")
+        recipes_limit = request.query_params.get("recipes_limit", "")
+        if recipes_limit.isdigit():
+            recipes = recipes[: int(recipes_limit)]
+        queryset = request.user.following.select_related(
+            "author"
+        ).annotate(
+            recipes_count=Count("author__recipes")
+        ).prefetch_related(
+            Prefetch("author__recipes", queryset=recipes,
+                     to_attr="preview_recipes")
+        ).order_by("id")
         page = self.paginate_queryset(queryset)
 
         if page is not None:
@@ -496,7 +518,17 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class CacheStatsView(views.APIView):
+    """Счётчики кэша воркера, обработавшего запрос"""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({"pid": os.getpid(), **cache_stats()})
+
+
+class IngredientViewSet(ServerTimingMixin,
+                        viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [AllowAny]
@@ -515,15 +547,36 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         return self.fetch_data_set()
 
+    def list(self, request, *args, **kwargs):
+        if request.query_params or request.accepted_renderer.format != "json":
+            return super().list(request, *args, **kwargs)
+        return catalog_response(request, render_catalog)
+
+    @action(detail=False, methods=["get"])
+    def version(self, request):
+        """Версия и адрес статического снимка справочника"""
+        snapshot = catalog_snapshot()
+        etag = f'"{snapshot["version"]}"'
+        if request.headers.get("If-None-Match") == etag:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({
+                "version": snapshot["version"],
+                "url": request.build_absolute_uri(snapshot["url"]),
+            })
+        response["ETag"] = etag
+        response["Cache-Control"] = "no-cache"
+        return response
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all().order_by("-date_created")
+class RecipeViewSet(ServerTimingMixin, viewsets.ModelViewSet):
+    queryset = Recipe.objects.all().order_by("-date_created", "-id")
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter]
     filterset_class = RecipeFilter
     search_fields = ["title"]
-    pagination_class = CustomPageNumberPagination
-    parser_classes = (MultiPartParser, FormParser, JSONParser)
+    pagination_class = CachedCountPagination
+    parser_classes = (MultiPartParser, FormParser, FastJSONParser)
     serializer_class = RecipeDetailsSerializer
 
     def get_serializer_context(self):
@@ -539,6 +592,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
         is_favorited = self.request.query_params.get("is_favorited")
         if is_favorited == "1" and not self.request.user.is_authenticated:
             return queryset.none()
+        if self.request.query_params.get("ordering") == "popular":
+            return queryset.order_by("-popularity", "-id")
         return queryset
 
     def get_object(self):
@@ -576,11 +631,22 @@ class RecipeViewSet(viewsets.ModelViewSet):
         except serializers.ValidationError as e:
             return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
 
+    def list(self, request, *args, **kwargs):
+        """Страница id из БД, сами рецепты - из кэша"""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.values_list("id", flat=True))
+        payloads = get_recipe_payloads(page)
+        return self.get_paginated_response(personalize(
+            [payloads[pk] for pk in page if pk in payloads], request
+        ))
+
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        serializer = self.get_serializer(instance,
-                                         context={"request": request})
-        return Response(serializer.data)
+        pk = str(self.kwargs.get("pk"))
+        payload = get_recipe_payloads([int(pk)]).get(int(pk)) if (
+            pk.isdigit()) else None
+        if payload is None:
+            raise Http404
+        return Response(personalize([payload], request)[0])
 
     @action(detail=True, methods=['post', 'delete'],
             permission_classes=[IsAuthenticated])
@@ -658,46 +724,143 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"],
             permission_classes=[IsAuthenticated])
     def download_shopping_cart(self, request):
+        """Список покупок текстом или PDF (?type=pdf)"""
         user = request.user
 
-        recipe_ids = user.shopping_carts.values_list(
-            "recipe_id", flat=True
-        )
-
-        if not recipe_ids:
+        if not user.shopping_carts.exists():
             return Response(
                 {"detail": "Ваша корзина покупок пуста"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        ingredients = (
-            RecipeIngredient.objects.filter(recipe_id__in=recipe_ids)
-            .values("ingredient__name", "ingredient__measurement_unit")
-            .annotate(total_amount=Sum("amount"))
-            .order_by("ingredient__name")
-        )
-
-        response = HttpResponse(content_type="text/plain")
-
-        content = "Список покупок:\n\n"
-        for i, item in enumerate(ingredients, 1):
-            name = item["ingredient__name"]
-            amount = item["total_amount"]
-            unit = item["ingredient__measurement_unit"]
-
-            content += f"{i}. {name} - {amount} {unit}\n"
+        if request.query_params.get("type") == "pdf":
+            rows = list(cart_ingredients(user))
+            path = cached_pdf(rows)
+            if path is None:
+                render_shopping_list.delay(user_id=user.pk)
+                # С JOBS_EAGER файл уже нарисован
+                path = cached_pdf(rows)
+            if path is None:
+                return Response(
+                    {"detail": "Список покупок готовится, повторите запрос"},
+                    status=status.HTTP_202_ACCEPTED,
+                    headers={"Location": request.get_full_path(),
+                             "Retry-After": "2"},
+                )
+            etag = f'"{path.stem}"'
+            if request.headers.get("If-None-Match") == etag:
+                return HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            response = FileResponse(path.open("rb"), as_attachment=True,
+                                    filename="shopping_list.pdf",
+                                    content_type="application/pdf")
+            response["ETag"] = etag
+            return response
+
+        ingredients = cart_ingredients(user)
+
+        def lines():
+            content = "Список покупок:\n\n"
+            for i, (name, unit, amount) in enumerate(
+                    ingredients.iterator(), 1):
+                content += f"{i}. {name} - {amount} {unit}\n"
+                if i % 100 == 0:
+                    yield content
+                    content = ""
+            yield content
+
+        return StreamingHttpResponse(lines(), content_type="text/plain")
 
-        response.write(content)
-        return response
+    @action(detail=False, methods=["get"],
+            permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        """Лента рецептов авторов из подписок"""
+        paginator = FeedCursorPagination()
+        page = paginator.paginate_queryset(
+            get_feed_queryset(request.user), request, view=self)
+        recipe_ids = [entry["recipe_id"] for entry in page]
+        payloads = get_recipe_payloads(recipe_ids)
+        return paginator.get_paginated_response(personalize(
+            [payloads[pk] for pk in recipe_ids if pk in payloads], request,
+        ))
 
     @action(
         detail=True, methods=["get"], url_path="get-link",
         permission_classes=[AllowAny]
     )
     def get_link(self, request, pk=None):
-        recipe = self.get_object()
-        base_url = request.build_absolute_uri("/")[:-1]
+        try:
+            code = get_or_create_code(int(pk))
+        except (Recipe.DoesNotExist, ValueError):
+            raise Http404
         return Response(
-            {"short-link": f"{base_url}/recipes/{recipe.id}"},
+            {"short-link": request.build_absolute_uri(f"/s/{code}")},
             status=status.HTTP_200_OK
         )
+
+
+def short_link_redirect(request, code):
+    """Переход по короткой ссылке без загрузки рецепта"""
+    try:
+        recipe_id = resolve_code(code)
+    except ShortLink.DoesNotExist:
+        raise Http404
+    return redirect(f"/recipes/{recipe_id}")
+
+
+def profile_list(request):
+    """Снятые профили запросов: сводка по эндпоинтам и список"""
+    profiles = list_profiles()
+    if route := request.GET.get("route"):
+        profiles = [item for item in profiles if item["route"] == route]
+
+    endpoints = {}
+    for item in profiles:
+        endpoint = endpoints.setdefault(item["route"], {
+            "route": item["route"], "count": 0, "total_ms": 0, "max_ms": 0})
+        endpoint["count"] += 1
+        endpoint["total_ms"] += item["duration_ms"]
+        endpoint["max_ms"] = max(endpoint["max_ms"], item["duration_ms"])
+    for endpoint in endpoints.values():
+        endpoint["avg_ms"] = round(endpoint["total_ms"] / endpoint["count"], 1)
+
+    if request.GET.get("o") == "duration":
+        profiles.sort(key=lambda item: item["duration_ms"], reverse=True)
+    else:
+        profiles.sort(key=lambda item: item["id"], reverse=True)
+    return render(request, "admin/profiles.html", {
+        **admin.site.each_context(request),
+        "title": "Профили запросов",
+        "endpoints": sorted(endpoints.values(),
+                            key=lambda item: item["total_ms"], reverse=True),
+        "profiles": profiles,
+        "route": route,
+    })
+
+
+def profile_download(request, profile_id):
+    path = profile_path(profile_id)
+    if path is None:
+        raise Http404
+    return FileResponse(path.open("rb"), as_attachment=True,
+                        filename=path.name)
+
+
+def schema(request, *args, **kwargs):
+    """Схема OpenAPI, drf_yasg загружается при первом обращении"""
+    from api import docs
+
+    return docs.schema(request, *args, **kwargs)
+
+
+def swagger_ui(request, *args, **kwargs):
+    from api import docs
+
+    return docs.swagger_ui(request, *args, **kwargs)
+
+
+def metrics(request):
+    """Метрики в текстовом формате Prometheus"""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(get_registry()),
+                        content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,84 @@
+"""Нагрузочный прогон HTTP-эндпоинтов: запросов в секунду и задержки.
+
+Пример сравнения синхронных и асинхронных воркеров:
+
+    gunicorn foodgram.wsgi -w 4 -b 127.0.0.1:8001
+    ASYNC_API=1 gunicorn foodgram.asgi:application -w 4 \\
+        -k uvicorn.workers.UvicornWorker -b 127.0.0.1:8002
+
+    python benchmarks/http_load.py http://127.0.0.1:8001/api/recipes/ \\
+        -c 200 -d 20
+    python benchmarks/http_load.py http://127.0.0.1:8002/api/recipes/ \\
+        -c 200 -d 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def worker(host, port, request, deadline, latencies, errors):
+    writer = None
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        if writer is None:
+            # Синхронные воркеры gunicorn не держат keep-alive
+            reader, writer = await asyncio.open_connection(host, port)
+        writer.write(request)
+        await writer.drain()
+        status_line = await reader.readline()
+        length, close = 0, False
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+            elif name.lower() == "connection":
+                close = value.strip().lower() == "close"
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - started)
+        if not status_line.split()[1].startswith(b"2"):
+            errors.append(status_line)
+        if close:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run(url, concurrency, duration, token):
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    headers = [f"GET {path} HTTP/1.1", f"Host: {parts.netloc}",
+               "Connection: keep-alive"]
+    if token:
+        headers.append(f"Authorization: Token {token}")
+    request = ("\r\n".join(headers) + "\r\n\r\n").encode()
+
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    await asyncio.gather(*(
+        worker(parts.hostname, parts.port or 80, request, deadline,
+               latencies, errors)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    print(f"{url} c={concurrency}")
+    print(f"  requests: {len(latencies)}, errors: {len(errors)}")
+    print(f"  rps:      {len(latencies) / elapsed:.1f}")
+    print(f"  p50:      {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"  p99:      "
+          f"{latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("url")
+    parser.add_argument("-c", "--concurrency", type=int, default=100)
+    parser.add_argument("-d", "--duration", type=float, default=10)
+    parser.add_argument("-t", "--token", help="токен для Authorization")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.concurrency, args.duration, args.token))
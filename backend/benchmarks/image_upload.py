@@ -0,0 +1,127 @@
+"""Пиковая память загрузки изображения из base64: старый и новый способ.
+
+Строка data URL готовится заранее, каждый сценарий читает её в отдельном
+процессе; в таблицу попадает прирост пикового RSS (VmHWM, сбрасывается
+через /proc/self/clear_refs, только Linux) и пик tracemalloc при разборе
+одной строки. Распакованные Pillow пиксели tracemalloc не видит:
+
+    python benchmarks/image_upload.py --size 3000
+    python benchmarks/image_upload.py --size 12000 --bomb
+"""
+import argparse
+import base64
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.files.base import ContentFile  # noqa: E402
+from PIL import Image  # noqa: E402
+from api.serializers import Base64ImageField  # noqa: E402
+
+SCENARIOS = ("старый", "новый", "аватар")
+
+
+def data_url(size, bomb):
+    """PNG со случайным шумом или пустой PNG, сжатый в сотни раз"""
+    if bomb:
+        image = Image.new("L", (size, size))
+    else:
+        image = Image.frombytes("RGB", (size, size), os.urandom(
+            size * size * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return ("data:image/png;base64,"
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+def old_decode(data):
+    """Прежний Base64ImageField: split и b64decode всей строки"""
+    format, imgstr = data.split(";base64,")
+    file = ContentFile(base64.b64decode(imgstr),
+                       name=f"{uuid.uuid4()}.png")
+    # Прежняя проверка DRF ImageField, как при сохранении модели
+    with Image.open(file) as image:
+        image.load()
+    return file
+
+
+def peak_rss():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("Нет VmHWM в /proc/self/status")
+
+
+def current_rss():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def run(scenario, data):
+    if scenario == "старый":
+        return old_decode(data)
+    field = Base64ImageField(resize_to=256 if scenario == "аватар" else None)
+    return field.to_internal_value(data)
+
+
+def child(scenario, path):
+    with open(path) as file:
+        data = file.read()
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+    before = current_rss()
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        run(scenario, data)
+        result = "принято"
+    except Exception as error:
+        result = type(error).__name__
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    print(len(data), (peak_rss() - before) // 1024 ** 2, peak // 1024 ** 2,
+          f"{elapsed * 1000:.0f}", result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=3000,
+                        help="сторона изображения в пикселях")
+    parser.add_argument("--bomb", action="store_true",
+                        help="пустой PNG в оттенках серого")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(*args.child)
+
+    print(f"{'способ':<8}{'base64, МБ':>12}{'RSS, МБ':>10}"
+          f"{'tracemalloc, МБ':>17}{'мс':>7}  результат")
+    with tempfile.NamedTemporaryFile("w", suffix=".txt") as file:
+        file.write(data_url(args.size, args.bomb))
+        file.flush()
+        for scenario in SCENARIOS:
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", scenario, file.name],
+                capture_output=True, text=True, check=True,
+            ).stdout.split(maxsplit=4)
+            length, rss, peak, elapsed, result = output
+            print(f"{scenario:<8}{int(length) / 1024 ** 2:>12.1f}{rss:>10}"
+                  f"{peak:>17}{elapsed:>7}  {result.strip()}")
+
+
+if __name__ == "__main__":
+    main()
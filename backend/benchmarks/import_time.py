@@ -0,0 +1,69 @@
+"""Время холодного старта: импорт при django.setup() и загрузке URLconf.
+
+Каждый замер — отдельный процесс с -X importtime, как у manage.py и
+воркера gunicorn без --preload:
+
+    python benchmarks/import_time.py -n 5 --top 15
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "setup": "import django; django.setup()",
+    "urls": (
+        "import django; django.setup(); "
+        "from django.urls import get_resolver; get_resolver().url_patterns"
+    ),
+    "wsgi": "from foodgram.wsgi import create_app; create_app()",
+}
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)")
+
+
+def measure(code):
+    """Время процесса и собственное время импорта каждого модуля, мкс"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE="foodgram.settings")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND,
+        env=env, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - started
+    modules = {
+        match[3]: int(match[1])
+        for match in map(LINE.match, result.stderr.splitlines()) if match
+    }
+    return wall, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-t", "--target", action="append",
+                        choices=list(TARGETS), dest="targets")
+    parser.add_argument("-n", "--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    for target in args.targets or TARGETS:
+        runs = [measure(TARGETS[target]) for _ in range(args.repeat)]
+        walls = [wall for wall, _ in runs]
+        modules = runs[-1][1]
+        packages = Counter()
+        for name, own in modules.items():
+            packages[name.split(".")[0]] += own
+        print(f"{target}: процесс {statistics.median(walls) * 1000:.0f} мс, "
+              f"импорт {sum(modules.values()) / 1000:.0f} мс, "
+              f"модулей {len(modules)}")
+        for package, own in packages.most_common(args.top):
+            print(f"    {package:<24}{own / 1000:>8.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Время кодирования и разбора JSON на крупных ответах API.
+
+Сравнивает стандартные JSONRenderer/JSONParser DRF с FastJSONRenderer и
+FastJSONParser на полном списке ингредиентов и странице из 100 рецептов:
+
+    python benchmarks/json_encode.py -n 50
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+from api.parsers import FastJSONParser  # noqa: E402
+from api.renderers import FastJSONRenderer  # noqa: E402
+from api.views import IngredientViewSet, RecipeViewSet  # noqa: E402
+
+ENDPOINTS = {
+    "/api/ingredients/": IngredientViewSet,
+    "/api/recipes/?limit=100": RecipeViewSet,
+}
+
+
+def response_data(path, viewset):
+    view = viewset.as_view({"get": "list"})
+    return view(APIRequestFactory().get(path)).data
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'эндпоинт':<26}{'байт':>9}{'encode std':>12}{'encode fast':>13}"
+          f"{'parse std':>11}{'parse fast':>12}  мс")
+    for path, viewset in ENDPOINTS.items():
+        data = response_data(path, viewset)
+        content = JSONRenderer().render(data)
+        results = [
+            best_of(lambda: renderer.render(data), args.repeat)
+            for renderer in (JSONRenderer(), FastJSONRenderer())
+        ] + [
+            best_of(lambda: parser.parse(io.BytesIO(content)), args.repeat)
+            for parser in (JSONParser(), FastJSONParser())
+        ]
+        print(f"{path:<26}{len(content):>9}{results[0]:>12.2f}"
+              f"{results[1]:>13.2f}{results[2]:>11.2f}{results[3]:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Задержка PATCH /api/recipes/<id>/ для рецепта с большим числом ингредиентов.
+
+Создаёт временный рецепт, редактирует его в нескольких сценариях и
+откатывает все изменения:
+
+    python benchmarks/recipe_edit.py --ingredients 40 -n 30
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+from users.models import User  # noqa: E402
+from recipes.models import Ingredient, Recipe, RecipeIngredient  # noqa: E402
+
+
+def scenarios(ingredient_ids, spare_ids):
+    """Название и функция, строящая список ингредиентов по номеру прогона"""
+    base = [{"id": pk, "amount": 10} for pk in ingredient_ids]
+    return {
+        "title only": lambda run: base,
+        "one amount": lambda run: [
+            dict(base[0], amount=11 + run % 2)] + base[1:],
+        "swap one": lambda run: base[:-1] + [
+            {"id": spare_ids[run % 2], "amount": 10}],
+        "replace all": lambda run: [
+            {"id": pk, "amount": 10}
+            for pk in (spare_ids if run % 2 else ingredient_ids)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ingredients", type=int, default=40)
+    parser.add_argument("-n", "--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    ids = list(Ingredient.objects.order_by("id").values_list(
+        "id", flat=True)[:args.ingredients * 2])
+    ingredient_ids, spare_ids = (ids[:args.ingredients],
+                                 ids[args.ingredients:])
+    author = User.objects.order_by("id").first()
+    client = APIClient()
+    client.force_authenticate(author)
+
+    with transaction.atomic():
+        recipe = Recipe.objects.create(
+            author=author, title="benchmark", description="benchmark",
+            preparation_time=10, image="recipes/benchmark.png",
+            ingredient_ids=sorted(ingredient_ids))
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient_id=pk, amount=10)
+            for pk in ingredient_ids)
+        url = f"/api/recipes/{recipe.id}/"
+
+        print(f"{'сценарий':<14}{'медиана, мс':>13}{'запросов':>10}")
+        for name, build in scenarios(ingredient_ids, spare_ids).items():
+            timings, queries = [], 0
+            for run in range(args.repeat):
+                data = {"name": f"benchmark {run}", "text": "benchmark",
+                        "cooking_time": 10, "ingredients": build(run)}
+                connection.queries_log.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = client.patch(url, data, format="json")
+                    timings.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.content
+                queries = len(captured)
+            print(f"{name:<14}{statistics.median(timings) * 1000:>13.1f}"
+                  f"{queries:>10}")
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
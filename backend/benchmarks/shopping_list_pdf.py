@@ -0,0 +1,83 @@
+"""Время и пиковая память PDF списка покупок: первая сборка и кэш.
+
+Временно кладёт в корзину рецепты, пока в списке не наберётся нужное
+число ингредиентов, и откатывает изменения:
+
+    python benchmarks/shopping_list_pdf.py --ingredients 300 -n 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import transaction  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from api.shopping_list import cart_ingredients, shopping_list_pdf  # noqa
+from recipes.models import Recipe, ShoppingCart  # noqa: E402
+from users.models import User  # noqa: E402
+
+
+def fill_cart(user, ingredients):
+    """Добавляет рецепты в корзину, пока в списке меньше ingredients строк"""
+    carts = []
+    for recipe_id in Recipe.objects.order_by("id").values_list(
+            "id", flat=True).iterator():
+        carts.append(ShoppingCart(user=user, recipe_id=recipe_id))
+        if len(carts) % 20 == 0:
+            ShoppingCart.objects.bulk_create(carts, ignore_conflicts=True)
+            carts = []
+            if cart_ingredients(user).count() >= ingredients:
+                break
+    ShoppingCart.objects.bulk_create(carts, ignore_conflicts=True)
+    return cart_ingredients(user).count()
+
+
+def measure(user):
+    tracemalloc.start()
+    started = time.perf_counter()
+    path = shopping_list_pdf(user)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ingredients", type=int, default=300)
+    parser.add_argument("-n", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    user = User.objects.order_by("id").first()
+    with transaction.atomic(), tempfile.TemporaryDirectory() as directory:
+        count = fill_cart(user, args.ingredients)
+        print(f"ингредиентов в списке: {count}")
+        print(f"{'сборка':<10}{'медиана, мс':>13}{'пик памяти, КБ':>16}")
+        results = {"холодная": [], "из кэша": []}
+        for run in range(args.repeat):
+            with override_settings(
+                    SHOPPING_LIST_CACHE_DIR=f"{directory}/{run}"):
+                results["холодная"].append(measure(user))
+                results["из кэша"].append(measure(user))
+        for name, runs in results.items():
+            print(f"{name:<10}"
+                  f"{statistics.median(r[0] for r in runs) * 1000:>13.1f}"
+                  f"{max(r[1] for r in runs) / 1024:>16.0f}")
+        size = runs[-1][2].stat().st_size
+        print(f"размер PDF: {size / 1024:.0f} КБ")
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
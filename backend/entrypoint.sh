@@ -10,6 +10,7 @@ echo "PostgreSQL is ready - executing migrations"
 # Выполнение миграций
 python manage.py makemigrations
 python manage.py migrate --noinput
+python manage.py write_catalog_snapshot
 
 # Запуск gunicorn (передается через CMD)
 exec "$@"
\ No newline at end of file
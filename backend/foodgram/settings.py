@@ -21,6 +21,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "djoser",
@@ -29,16 +30,23 @@ INSTALLED_APPS = [
     "api.apps.ApiConfig",
     "users.apps.UsersConfig",
     "recipes.apps.RecipesConfig",
+    "jobs.apps.JobsConfig",
     "corsheaders",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "api.middleware.MetricsMiddleware",
+    "api.middleware.ServerTimingMiddleware",
+    "api.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # После аутентификации: профиль пишется только для staff
+    "api.middleware.ProfilingMiddleware",
+    "api.middleware.CartCountHeaderMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -56,12 +64,18 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "api.context_processors.cart_count",
+                "api.context_processors.viewer",
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = "foodgram.wsgi.application"
+ASGI_APPLICATION = "foodgram.asgi.application"
+
+# Асинхронные версии горячих GET-эндпоинтов (запуск через uvicorn-воркеры)
+ASYNC_API = os.getenv("ASYNC_API", "0") == "1"
 
 
 DATABASES = {
@@ -75,6 +89,34 @@ DATABASES = {
     }
 }
 
+# L1 в памяти каждого воркера перед общим для воркеров кэшем "shared".
+# В docker-compose общий кэш - Redis (CACHE_BACKEND, CACHE_LOCATION): только
+# в нём add и incr атомарны между процессами. Файловый кэш по умолчанию -
+# для локальной разработки: он не атомарен и при каждой записи обходит
+# каталог, поэтому держит немного записей.
+CACHE_BACKEND = os.getenv(
+    "CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache")
+SHARED_CACHE = {
+    "BACKEND": CACHE_BACKEND,
+    "LOCATION": os.getenv("CACHE_LOCATION", "/var/tmp/foodgram_cache"),
+}
+if CACHE_BACKEND.endswith(".FileBasedCache"):
+    SHARED_CACHE["OPTIONS"] = {
+        "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", "2000")),
+    }
+
+CACHES = {
+    "default": {
+        "BACKEND": "api.cache.TwoTierCache",
+        "LOCATION": "foodgram",
+        "OPTIONS": {
+            "L2": "shared",
+            "L1_MAX_ENTRIES": int(os.getenv("CACHE_L1_MAX_ENTRIES", "1024")),
+            "L1_TIMEOUT": int(os.getenv("CACHE_L1_TIMEOUT", "5")),
+        },
+    },
+    "shared": SHARED_CACHE,
+}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -107,6 +149,15 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.TokenAuthentication",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 6,
 }
@@ -120,14 +171,89 @@ DJOSER = {
     },
 }
 
+# Лента подписок: сколько записей хранить на пользователя и с какого
+# числа подписок собирать ленту запросом вместо предрассчитанной таблицы
+FEED_CAP = int(os.getenv("FEED_CAP", "500"))
+FEED_PULL_THRESHOLD = int(os.getenv("FEED_PULL_THRESHOLD", "200"))
+
+# Период полураспада веса добавлений в избранное и корзину и ширина окна
+# пересчёта в периодах (вклад более старых добавлений меньше 0.1%)
+POPULARITY_HALF_LIFE_DAYS = float(
+    os.getenv("POPULARITY_HALF_LIFE_DAYS", "7"))
+POPULARITY_WINDOW_HALF_LIVES = int(
+    os.getenv("POPULARITY_WINDOW_HALF_LIVES", "10"))
+
+# Кэш числа записей в постраничных списках и порог, начиная с которого
+# для списков без фильтров берётся оценка планировщика
+PAGINATION_COUNT_TIMEOUT = int(os.getenv("PAGINATION_COUNT_TIMEOUT", "300"))
+PAGINATION_ESTIMATE_THRESHOLD = int(
+    os.getenv("PAGINATION_ESTIMATE_THRESHOLD", "10000"))
+
+# Время жизни закэшированных карточек рецептов
+RECIPE_CACHE_TIMEOUT = int(os.getenv("RECIPE_CACHE_TIMEOUT", "3600"))
+
+# Время жизни счётчика корзины в кэше: ограничивает расхождение с БД,
+# если сброс после коммита не дошёл до кэша
+CART_COUNT_TIMEOUT = int(os.getenv("CART_COUNT_TIMEOUT", "300"))
+
+# Ответы API меньше этого размера (в байтах) не сжимаются
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Профилирование запросов: доля случайно профилируемых запросов (0 - только
+# по заголовку X-Profile от staff), каталог и число хранимых профилей
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_DIR = os.getenv("PROFILING_DIR", "/var/tmp/foodgram_profiles")
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "200"))
+
+# Сколько самых долгих нормализованных SQL-запросов отдавать в /metrics
+METRICS_TOP_STATEMENTS = int(os.getenv("METRICS_TOP_STATEMENTS", "20"))
+
+# Доступ к /metrics: запросы из этих сетей (через запятую), с заголовком
+# Authorization: Bearer <METRICS_TOKEN> или от staff. Остальным - 403
+METRICS_ALLOWED_NETWORKS = os.getenv(
+    "METRICS_ALLOWED_NETWORKS", "127.0.0.1/32,::1/128")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Доля запросов API с заголовком Server-Timing (staff получают его
+# по заголовку X-Server-Timing: 1)
+SERVER_TIMING_SAMPLE_RATE = float(
+    os.getenv("SERVER_TIMING_SAMPLE_RATE", "0"))
+
+# Фоновые задания: с JOBS_EAGER=1 выполняются в процессе запроса после
+# коммита (разработка без run_worker). Паузы повторов и таймауты в секундах
+JOBS_EAGER = os.getenv("JOBS_EAGER", "0") == "1"
+JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "1"))
+JOBS_LOCK_TIMEOUT = int(os.getenv("JOBS_LOCK_TIMEOUT", "600"))
+JOBS_BACKOFF_BASE = float(os.getenv("JOBS_BACKOFF_BASE", "5"))
+JOBS_BACKOFF_MAX = float(os.getenv("JOBS_BACKOFF_MAX", "3600"))
+JOBS_KEEP_DONE = int(os.getenv("JOBS_KEEP_DONE", "86400"))
+
+# PDF списков покупок: шрифт с кириллицей, каталог кэша и число файлов в нём
+SHOPPING_LIST_FONT = os.getenv(
+    "SHOPPING_LIST_FONT", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+SHOPPING_LIST_CACHE_DIR = os.getenv(
+    "SHOPPING_LIST_CACHE_DIR", "/var/tmp/foodgram_shopping_lists")
+SHOPPING_LIST_CACHE_MAX_FILES = int(
+    os.getenv("SHOPPING_LIST_CACHE_MAX_FILES", "1000"))
+
+# Загрузка изображений: предел размера файла (как client_max_body_size в
+# nginx), числа пикселей по заголовку, размер временного файла в памяти
+# и сторона квадратного аватара
+IMAGE_MAX_UPLOAD_SIZE = int(
+    os.getenv("IMAGE_MAX_UPLOAD_SIZE", str(10 * 1024 * 1024)))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(4096 * 4096)))
+IMAGE_SPOOL_SIZE = int(os.getenv("IMAGE_SPOOL_SIZE", str(1024 * 1024)))
+AVATAR_SIZE = int(os.getenv("AVATAR_SIZE", "256"))
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost",
     "http://localhost:3000",
 ]
 CORS_ALLOW_CREDENTIALS = True
+CORS_EXPOSE_HEADERS = ["X-Cart-Count"]
 
 SWAGGER_SETTINGS = {
-    "DEFAULT_INFO": "api.urls.swagger_info",
+    "DEFAULT_INFO": "api.docs.swagger_info",
 }
 
 LOGGING = {
@@ -143,5 +269,9 @@ LOGGING = {
             "handlers": ["console"],
             "level": "INFO",
         },
+        "jobs": {
+            "handlers": ["console"],
+            "level": "INFO",
+        },
     },
 }
@@ -2,11 +2,20 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from api.views import (metrics, profile_download, profile_list,
+                       short_link_redirect)
 
 
 urlpatterns = [
+    path("admin/profiles/", admin.site.admin_view(profile_list),
+         name="admin_profiles"),
+    path("admin/profiles/<str:profile_id>.prof",
+         admin.site.admin_view(profile_download),
+         name="admin_profile_download"),
     path("admin/", admin.site.urls),
     path("api/", include("api.urls")),
+    path("s/<str:code>", short_link_redirect, name="short_link"),
+    path("metrics", metrics, name="metrics"),
 ]
 
 if settings.DEBUG:
@@ -14,3 +14,29 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
 
 application = get_wsgi_application()
+
+
+def warm_up():
+    """Импортирует представления и собирает URL и поля сериализаторов"""
+    from django.db import connections
+    from django.urls import get_resolver, reverse
+    from rest_framework.serializers import BaseSerializer
+
+    reverse("recipes-list")  # компилирует регулярные выражения всех URL
+    patterns = list(get_resolver().url_patterns)
+    while patterns:
+        pattern = patterns.pop()
+        patterns.extend(getattr(pattern, "url_patterns", ()))
+        view = getattr(getattr(pattern, "callback", None), "cls", None)
+        serializer_class = getattr(view, "serializer_class", None)
+        if (isinstance(serializer_class, type)
+                and issubclass(serializer_class, BaseSerializer)):
+            serializer_class(context={}).fields
+    # Соединения мастера не должны достаться воркерам после fork
+    connections.close_all()
+
+
+def create_app():
+    """Приложение для gunicorn --preload: воркеры стартуют прогретыми"""
+    warm_up()
+    return application
@@ -0,0 +1,23 @@
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+
+# Мастер импортирует приложение (foodgram.wsgi:create_app()) до fork,
+# воркеры получают готовые модули, URL и поля сериализаторов
+wsgi_app = "foodgram.wsgi:create_app()"
+preload_app = True
+
+
+def on_starting(server):
+    """Метрики прошлого запуска не должны попасть в новые счётчики"""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,18 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "run_at",
+                    "finished_at")
+    list_filter = ("status", "name")
+    readonly_fields = ("created_at", "locked_at", "locked_by", "finished_at",
+                       "last_error")
+    actions = ["retry"]
+
+    @admin.action(description="Поставить в очередь заново")
+    def retry(self, request, queryset):
+        queryset.update(status=Job.QUEUED, attempts=0, run_at=timezone.now(),
+                        locked_at=None)
@@ -0,0 +1,58 @@
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils.module_loading import autodiscover_modules
+from prometheus_client import start_http_server
+from api.metrics import get_registry
+from jobs.queue import tasks, work
+
+
+class Command(BaseCommand):
+    help = "Выполнение фоновых заданий из очереди"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-c", "--concurrency", type=int, default=1)
+        parser.add_argument("--mode", choices=["threads", "processes"],
+                            default="threads")
+        parser.add_argument("--metrics-port", type=int)
+
+    def handle(self, *args, **options):
+        autodiscover_modules("tasks")
+        if options["mode"] == "processes":
+            context = multiprocessing.get_context("fork")
+            stop, worker_class = context.Event(), context.Process
+        else:
+            stop, worker_class = threading.Event(), threading.Thread
+
+        stopping = []
+
+        def shutdown(signum, frame):
+            # Event.set() в обработчике может зависнуть на замке Event.wait()
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        if options["metrics_port"]:
+            start_http_server(options["metrics_port"],
+                              registry=get_registry())
+
+        # Дочерние процессы открывают свои соединения
+        connections.close_all()
+        workers = [worker_class(target=work, args=(stop, number))
+                   for number in range(options["concurrency"])]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(
+            f"Воркеров: {len(workers)} ({options['mode']}), "
+            f"задач: {', '.join(sorted(tasks))}"
+        )
+        while not stopping:
+            time.sleep(0.5)
+        stop.set()
+        for worker in workers:
+            worker.join()
+        self.stdout.write(self.style.SUCCESS("Воркеры остановлены"))
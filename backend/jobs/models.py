@@ -0,0 +1,53 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Задание очереди, которое выполняет manage.py run_worker"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Выполнено"),
+        (FAILED, "Ошибка"),
+    ]
+
+    name = models.CharField(max_length=200, verbose_name="Задача")
+    payload = models.JSONField(default=dict, verbose_name="Аргументы")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default=QUEUED, verbose_name="Статус")
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name="Попытки")
+    max_attempts = models.PositiveSmallIntegerField(
+        default=5, verbose_name="Максимум попыток")
+    run_at = models.DateTimeField(default=timezone.now,
+                                  verbose_name="Запустить после")
+    locked_at = models.DateTimeField(null=True, blank=True,
+                                     verbose_name="Взято в работу")
+    locked_by = models.CharField(max_length=100, blank=True,
+                                 verbose_name="Воркер")
+    last_error = models.TextField(blank=True, verbose_name="Ошибка")
+    created_at = models.DateTimeField(auto_now_add=True,
+                                      verbose_name="Создано")
+    finished_at = models.DateTimeField(null=True, blank=True,
+                                       verbose_name="Завершено")
+
+    class Meta:
+        verbose_name = "Задание"
+        verbose_name_plural = "Задания"
+        indexes = [
+            models.Index(fields=["run_at"], name="job_queued_idx",
+                         condition=Q(status="queued")),
+            models.Index(fields=["locked_at"], name="job_running_idx",
+                         condition=Q(status="running")),
+            models.Index(fields=["finished_at"], name="job_done_idx",
+                         condition=Q(status="done")),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
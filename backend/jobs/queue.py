@@ -0,0 +1,153 @@
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (DatabaseError, close_old_connections, connection,
+                       transaction)
+from django.db.models import Q
+from django.utils import timezone
+from api.metrics import JOB_DURATION, JOB_WAIT, JOBS
+from jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+tasks = {}
+
+
+class Task:
+    """Функция, которую можно выполнить сразу или поставить в очередь"""
+
+    def __init__(self, func, max_attempts, unique):
+        self.func = func
+        self.name = f"{func.__module__}.{func.__qualname__}"
+        self.max_attempts = max_attempts
+        self.unique = unique
+        tasks[self.name] = self
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def delay(self, **kwargs):
+        """Ставит задание в очередь текущей транзакции.
+
+        Задание видно воркерам только после коммита. С JOBS_EAGER оно
+        выполняется в этом же процессе сразу после коммита.
+        """
+        if settings.JOBS_EAGER:
+            transaction.on_commit(lambda: self.func(**kwargs))
+            return None
+        if self.unique:
+            queued = Job.objects.filter(name=self.name, payload=kwargs,
+                                        status=Job.QUEUED).first()
+            if queued is not None:
+                return queued
+        return Job.objects.create(name=self.name, payload=kwargs,
+                                  max_attempts=self.max_attempts)
+
+
+def task(func=None, *, max_attempts=5, unique=False):
+    """Регистрирует задачу; unique не дублирует ожидающее задание"""
+    if func is None:
+        return lambda func: Task(func, max_attempts, unique)
+    return Task(func, max_attempts, unique)
+
+
+def backoff(attempt):
+    """Пауза перед повтором: экспонента со случайным разбросом"""
+    delay = min(settings.JOBS_BACKOFF_MAX,
+                settings.JOBS_BACKOFF_BASE * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def claim_job(worker_id):
+    """Забирает одно задание; занятые другими воркерами строки пропускаются.
+
+    Блокировка строки держится только до смены статуса, само задание
+    выполняется вне транзакции. Задания зависших воркеров берутся снова
+    через JOBS_LOCK_TIMEOUT секунд.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            Q(status=Job.QUEUED, run_at__lte=now)
+            | Q(status=Job.RUNNING, locked_at__lt=stale)
+        ).order_by("run_at").first()
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.locked_at = now
+        job.locked_by = worker_id
+        job.save(update_fields=["status", "attempts", "locked_at",
+                                "locked_by"])
+    return job
+
+
+def run_job(job):
+    JOB_WAIT.labels(job.name).observe(
+        max(0.0, (job.locked_at - job.run_at).total_seconds()))
+    started = time.perf_counter()
+    try:
+        if job.name not in tasks:
+            raise LookupError(f"Неизвестная задача {job.name}")
+        if job.attempts > job.max_attempts:
+            raise RuntimeError("Превышено число попыток")
+        tasks[job.name].func(**job.payload)
+    except Exception:
+        logger.exception("Задание %s завершилось ошибкой", job)
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=backoff(job.attempts))
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+    else:
+        job.status = Job.DONE
+        job.finished_at = timezone.now()
+    JOB_DURATION.labels(job.name).observe(time.perf_counter() - started)
+    JOBS.labels(job.name, "retry" if job.status == Job.QUEUED
+                else job.status).inc()
+    job.locked_at = None
+    job.save(update_fields=["status", "run_at", "locked_at", "last_error",
+                            "finished_at"])
+
+
+def prune_jobs():
+    """Удаляет выполненные задания старше JOBS_KEEP_DONE секунд"""
+    Job.objects.filter(
+        status=Job.DONE,
+        finished_at__lt=timezone.now() - timedelta(
+            seconds=settings.JOBS_KEEP_DONE),
+    ).delete()
+
+
+def work(stop, number=0):
+    """Цикл воркера: выполняет задания, пока не выставлен stop"""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{number}"
+    next_prune = 0.0
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                job = claim_job(worker_id)
+                if job is not None:
+                    run_job(job)
+                    continue
+                if time.monotonic() >= next_prune:
+                    prune_jobs()
+                    next_prune = (time.monotonic()
+                                  + settings.JOBS_KEEP_DONE / 10)
+            except DatabaseError:
+                logger.exception("Воркер %s потерял базу", worker_id)
+                connection.close()
+            stop.wait(settings.JOBS_POLL_INTERVAL)
+    finally:
+        connection.close()
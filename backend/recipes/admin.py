@@ -1,5 +1,8 @@
 from django.contrib import admin
 from django import forms
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from api.admin import LargeTableAdmin
 from .models import (Recipe, Ingredient, RecipeIngredient, Favorite,
                      ShoppingCart)
 
@@ -25,6 +28,7 @@ class RecipeForm(forms.ModelForm):
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     extra = 1
+    autocomplete_fields = ("ingredient",)
     fields = ("ingredient", "amount", "measurement_unit")
     readonly_fields = ("measurement_unit",)
 
@@ -33,10 +37,11 @@ class RecipeIngredientInline(admin.TabularInline):
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdmin):
     list_display = ("title", "author", "get_favorite_count")
+    list_select_related = ("author",)
     search_fields = ("title", "author__username", "author__email")
-    list_filter = ("author",)
+    autocomplete_fields = ("author",)
     fields = (
         "title",
         "author",
@@ -48,8 +53,21 @@ class RecipeAdmin(admin.ModelAdmin):
     readonly_fields = ("date_created",)
     inlines = [RecipeIngredientInline]
 
+    def get_queryset(self, request):
+        # Подзапрос считается только для строк текущей страницы, в отличие
+        # от Count с GROUP BY по всему избранному
+        favorites = (
+            Favorite.objects.filter(recipe=OuterRef("pk"))
+            .order_by().values("recipe").annotate(count=Count("*"))
+            .values("count")
+        )
+        return super().get_queryset(request).annotate(
+            favorite_count=Coalesce(
+                Subquery(favorites, output_field=IntegerField()), 0))
+
+    @admin.display(description="В избранном")
     def get_favorite_count(self, obj):
-        return obj.favorites.count()
+        return obj.favorite_count
 
 
 @admin.register(Ingredient)
@@ -59,17 +77,23 @@ class IngredientAdmin(admin.ModelAdmin):
 
 
 @admin.register(RecipeIngredient)
-class RecipeIngredientAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(LargeTableAdmin):
     list_display = ("recipe", "ingredient", "amount", "measurement_unit")
+    list_select_related = ("recipe", "ingredient")
+    autocomplete_fields = ("recipe", "ingredient")
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(LargeTableAdmin):
     list_display = ("user", "recipe")
+    list_select_related = ("user", "recipe")
     search_fields = ("user__username", "recipe__title")
+    autocomplete_fields = ("user", "recipe")
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(LargeTableAdmin):
     list_display = ("user", "recipe")
+    list_select_related = ("user", "recipe")
     search_fields = ("user__username", "recipe__title")
+    autocomplete_fields = ("user", "recipe")
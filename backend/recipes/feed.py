@@ -0,0 +1,107 @@
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from users.models import Follow, User
+from recipes.models import Recipe, FeedEntry
+
+
+def uses_timeline(following_count):
+    """Лента из таблицы FeedEntry или выборка по подпискам на лету"""
+    return following_count <= settings.FEED_PULL_THRESHOLD
+
+
+def change_following_count(user_id, delta):
+    """Сдвигает User.following_count и возвращает новое значение"""
+    User.objects.filter(pk=user_id).update(
+        following_count=F("following_count") + delta)
+    return User.objects.filter(pk=user_id).values_list(
+        "following_count", flat=True).first()
+
+
+def get_feed_queryset(user):
+    """Записи ленты: словари с recipe_id и date_created.
+
+    Лента из FeedEntry сортируется и листается по её собственным полям,
+    которые покрывает индекс feed_user_date_idx.
+    """
+    if uses_timeline(user.following_count):
+        return FeedEntry.objects.filter(user=user).values(
+            "recipe_id", "date_created")
+    return Recipe.objects.filter(author__followers__user=user).values(
+        "date_created", recipe_id=F("id"))
+
+
+def trim_timelines(user_ids):
+    """Оставляет в лентах не больше FEED_CAP последних записей"""
+    overflow = FeedEntry.objects.filter(user_id__in=user_ids).annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=F("user_id"),
+            order_by=[F("date_created").desc(), F("recipe_id").desc()],
+        ),
+    ).filter(position__gt=settings.FEED_CAP).values_list("id", flat=True)
+    FeedEntry.objects.filter(id__in=list(overflow)).delete()
+
+
+def fan_out_recipe(recipe):
+    """Добавляет новый рецепт в ленты подписчиков автора"""
+    follower_ids = list(
+        Follow.objects.filter(
+            author_id=recipe.author_id,
+            user__following_count__lte=settings.FEED_PULL_THRESHOLD,
+        ).values_list("user_id", flat=True)
+    )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, recipe=recipe,
+                      date_created=recipe.date_created)
+            for user_id in follower_ids
+        ],
+        ignore_conflicts=True,
+    )
+    trim_timelines(follower_ids)
+
+
+def backfill_follow(follow):
+    """Учитывает подписку и переносит в ленту последние рецепты автора"""
+    if not uses_timeline(change_following_count(follow.user_id, 1)):
+        return
+    recipes = (
+        Recipe.objects.filter(author_id=follow.author_id)
+        .order_by("-date_created")
+        .values_list("id", "date_created")[:settings.FEED_CAP]
+    )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=follow.user_id, recipe_id=recipe_id,
+                      date_created=date_created)
+            for recipe_id, date_created in recipes
+        ],
+        ignore_conflicts=True,
+    )
+    trim_timelines([follow.user_id])
+
+
+def rebuild_timeline(user):
+    """Заново собирает ленту пользователя из его подписок"""
+    FeedEntry.objects.filter(user=user).delete()
+    recipes = (
+        Recipe.objects.filter(author__followers__user=user)
+        .order_by("-date_created")
+        .values_list("id", "date_created")[:settings.FEED_CAP]
+    )
+    FeedEntry.objects.bulk_create(
+        FeedEntry(user=user, recipe_id=recipe_id, date_created=date_created)
+        for recipe_id, date_created in recipes
+    )
+
+
+def remove_follow(follow):
+    """Учитывает отписку и убирает из ленты рецепты автора"""
+    following_count = change_following_count(follow.user_id, -1)
+    FeedEntry.objects.filter(
+        user_id=follow.user_id, recipe__author_id=follow.author_id
+    ).delete()
+    if following_count == settings.FEED_PULL_THRESHOLD:
+        # Пользователь вернулся под порог: лента раньше не заполнялась
+        rebuild_timeline(User(pk=follow.user_id))
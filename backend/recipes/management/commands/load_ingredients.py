@@ -3,6 +3,8 @@ from pathlib import Path
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from recipes.models import Ingredient
+from api.cache import bump_table_version
+from api.catalog import catalog_changed
 
 
 class Command(BaseCommand):
@@ -17,6 +19,9 @@ class Command(BaseCommand):
 
             Ingredient.objects.bulk_create(ingredients, ignore_conflicts=True)
             created_count = Ingredient.objects.count() - count
+            # bulk_create не отправляет сигналы
+            catalog_changed()
+            bump_table_version(Ingredient._meta.db_table)
 
             self.stdout.write(
                 self.style.SUCCESS(
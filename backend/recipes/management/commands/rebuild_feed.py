@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from users.models import Follow, User
+from recipes.feed import rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = "Пересборка предрассчитанных лент подписок"
+
+    def handle(self, *args, **options):
+        # Подписки, созданные в обход сигналов, тоже учитываются
+        User.objects.update(following_count=Coalesce(Subquery(
+            Follow.objects.filter(user=OuterRef("pk")).order_by()
+            .values("user").annotate(total=Count("id")).values("total")
+        ), 0))
+        users = User.objects.filter(
+            following_count__gt=0,
+            following_count__lte=settings.FEED_PULL_THRESHOLD,
+        )
+        count = 0
+        for user in users.iterator():
+            rebuild_timeline(user)
+            count += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Пересобрано лент: {count}")
+        )
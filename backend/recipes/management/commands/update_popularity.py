@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from recipes.popularity import update_popularity
+
+
+class Command(BaseCommand):
+    help = "Пересчёт популярности рецептов по добавлениям за окно"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        updated = update_popularity(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Обновлена популярность: {updated}")
+        )
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:38
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0003_feedentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="favorite",
+            name="date_added",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name="Дата добавления",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="popularity",
+            field=models.FloatField(default=0, verbose_name="Популярность"),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["-popularity", "-id"], name="recipe_popularity_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:39
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_popularity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="ingredient_ids",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.BigIntegerField(),
+                blank=True,
+                default=list,
+                editable=False,
+                size=None,
+                verbose_name="ID ингредиентов",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["ingredient_ids"], name="recipe_ingredient_ids_idx"
+            ),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE recipes_recipe AS recipe
+            SET ingredient_ids = ARRAY(
+                SELECT ingredient_id FROM recipes_recipeingredient
+                WHERE recipe_id = recipe.id
+                ORDER BY ingredient_id
+            )
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.23 on 2026-10-19 10:56
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_shortlink"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="ingredient",
+            options={
+                "ordering": ["name"],
+                "verbose_name": "Ингредиент",
+                "verbose_name_plural": "Ингредиенты",
+            },
+        ),
+        migrations.AlterField(
+            model_name="recipe",
+            name="preparation_time",
+            field=models.PositiveSmallIntegerField(
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(32000),
+                ],
+                verbose_name="Время приготовления (минуты)",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="recipe",
+            name="title",
+            field=models.CharField(max_length=256, verbose_name="Название рецепта"),
+        ),
+        migrations.AlterField(
+            model_name="recipeingredient",
+            name="amount",
+            field=models.PositiveSmallIntegerField(
+                validators=[
+                    django.core.validators.MinValueValidator(1),
+                    django.core.validators.MaxValueValidator(32000),
+                ],
+                verbose_name="Количество ингредиента",
+            ),
+        ),
+    ]
@@ -1,4 +1,7 @@
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -17,6 +20,11 @@ class Ingredient(models.Model):
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
         ordering = ['name']
+        indexes = [
+            # name__istartswith превращается в UPPER(name) LIKE 'X%'
+            models.Index(OpClass(Upper("name"), name="varchar_pattern_ops"),
+                         name="ingredient_upper_name_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -28,6 +36,7 @@ class Recipe(models.Model):
         on_delete=models.CASCADE,
         related_name="recipes",
         verbose_name="Автор рецепта",
+        db_index=False,
     )
     title = models.CharField(max_length=256, verbose_name="Название рецепта")
     image = models.ImageField(
@@ -47,19 +56,45 @@ class Recipe(models.Model):
     )
     date_created = models.DateTimeField(auto_now_add=True,
                                         verbose_name="Дата создания")
+    popularity = models.FloatField(default=0,
+                                   verbose_name="Популярность")
+    ingredient_ids = ArrayField(
+        models.BigIntegerField(),
+        default=list,
+        blank=True,
+        editable=False,
+        verbose_name="ID ингредиентов",
+    )
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
-        ordering = ['title']
+        indexes = [
+            models.Index(fields=["-date_created", "-id"],
+                         name="recipe_date_created_idx"),
+            models.Index(fields=["author", "-date_created", "-id"],
+                         name="recipe_author_date_id_idx"),
+            models.Index(fields=["-popularity", "-id"],
+                         name="recipe_popularity_idx"),
+            GinIndex(fields=["ingredient_ids"],
+                     name="recipe_ingredient_ids_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
+    def refresh_ingredient_ids(self):
+        """Синхронизирует индекс ингредиентов с RecipeIngredient"""
+        self.ingredient_ids = sorted(
+            self.recipeingredient_set.values_list("ingredient_id", flat=True)
+        )
+        Recipe.objects.filter(pk=self.pk).update(
+            ingredient_ids=self.ingredient_ids)
+
 
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE,
-                               verbose_name="Рецепт")
+                               verbose_name="Рецепт", db_index=False)
     ingredient = models.ForeignKey(
         Ingredient, on_delete=models.CASCADE, verbose_name="Ингредиент"
     )
@@ -74,7 +109,6 @@ class RecipeIngredient(models.Model):
         unique_together = ("recipe", "ingredient")
         verbose_name = "Ингредиент в рецепте"
         verbose_name_plural = "Ингредиенты в рецепте"
-        ordering = ['recipe']
 
     def __str__(self):
         return f"{self.recipe}"
@@ -86,6 +120,7 @@ class Favorite(models.Model):
         on_delete=models.CASCADE,
         verbose_name="Пользователь",
         related_name="favorites",
+        db_index=False,
     )
     recipe = models.ForeignKey(
         Recipe,
@@ -93,11 +128,16 @@ class Favorite(models.Model):
         verbose_name="Рецепт",
         related_name="in_favorites",
     )
+    date_added = models.DateTimeField(auto_now_add=True,
+                                      verbose_name="Дата добавления")
 
     class Meta:
         verbose_name = "Избранное"
         verbose_name_plural = "Избранные"
-        ordering = ['recipe']
+        indexes = [
+            models.Index(fields=["user", "recipe"],
+                         name="favorite_user_recipe_idx"),
+        ]
 
     def __str__(self):
         return f"{self.recipe}"
@@ -109,6 +149,7 @@ class ShoppingCart(models.Model):
         on_delete=models.CASCADE,
         verbose_name="Пользователь",
         related_name="shopping_carts",
+        db_index=False,
     )
     recipe = models.ForeignKey(
         Recipe,
@@ -126,20 +167,61 @@ class ShoppingCart(models.Model):
         unique_together = ("user", "recipe")
         verbose_name = "Список покупок"
         verbose_name_plural = "Списки покупок"
-        ordering = ['recipe']
+        indexes = [
+            models.Index(fields=["user", "-date_added"],
+                         name="cart_user_date_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} added {self.recipe.title} to shopping cart"
 
-    def save(self, *args, **kwargs):
-        """Сохраняем снимок ингредиентов при создании"""
-        if not self.pk:
-            self.ingredients_snapshot = [
-                {
-                    "name": ri.ingredient.name,
-                    "unit": ri.ingredient.measurement_unit,
-                    "amount": ri.amount,
-                }
-                for ri in self.recipe.recipeingredient_set.all()
-            ]
-        super().save(*args, **kwargs)
+
+class FeedEntry(models.Model):
+    """Рецепт в предрассчитанной ленте подписчика"""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name="Подписчик",
+        related_name="feed_entries",
+        db_index=False,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+        related_name="feed_entries",
+    )
+    date_created = models.DateTimeField(verbose_name="Дата создания рецепта")
+
+    class Meta:
+        unique_together = ("user", "recipe")
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        indexes = [
+            # Ключ курсора ленты: дата и id рецепта
+            models.Index(fields=["user", "-date_created", "-recipe"],
+                         name="feed_user_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe} in feed of {self.user}"
+
+
+class ShortLink(models.Model):
+    """Короткий код ссылки на рецепт"""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+        related_name="short_link",
+    )
+    code = models.CharField(max_length=16, unique=True, verbose_name="Код")
+
+    class Meta:
+        verbose_name = "Короткая ссылка"
+        verbose_name_plural = "Короткие ссылки"
+
+    def __str__(self):
+        return self.code
@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import (Exists, F, FloatField, Func, OuterRef, Q,
+                              Subquery, Sum, Value)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+SOURCES = {
+    "favorite": (Favorite, 1.0),
+    "shopping_cart": (ShoppingCart, 0.5),
+}
+
+
+class Decay(Func):
+    """0.5 ** (возраст записи / период полураспада), считается в Postgres"""
+
+    arg_joiner = " - "
+    template = (
+        "POWER(0.5, EXTRACT(EPOCH FROM (%(expressions)s)) / %(half_life)s)"
+    )
+    output_field = FloatField()
+
+    def __init__(self, now, half_life):
+        super().__init__(Value(now), F("date_added"),
+                         half_life=float(half_life))
+
+
+def window():
+    """Начало окна, за пределами которого вклад событий пренебрежимо мал"""
+    return timezone.now() - timedelta(
+        days=settings.POPULARITY_HALF_LIFE_DAYS
+        * settings.POPULARITY_WINDOW_HALF_LIVES)
+
+
+def source_score(model, weight, now, since):
+    """Сумма затухших весов записей источника для рецепта из OuterRef"""
+    half_life = settings.POPULARITY_HALF_LIFE_DAYS * 24 * 60 * 60
+    score = model.objects.filter(
+        recipe=OuterRef("pk"), date_added__gte=since
+    ).order_by().values("recipe").annotate(
+        score=Sum(Decay(now, half_life))
+    ).values("score")
+    return Coalesce(Subquery(score, output_field=FloatField()),
+                    Value(0.0)) * Value(weight)
+
+
+def update_popularity(batch_size=10000):
+    """Полный пересчёт счёта рецептов по событиям в окне, пачками по id.
+
+    Счёт затухает от текущего момента, поэтому не переполняется, а
+    удалённые и поздно закоммиченные записи учитываются при следующем
+    запуске. Рецепты без счёта и без событий в окне не трогаются.
+    """
+    now = timezone.now()
+    since = window()
+    score = sum((source_score(model, weight, now, since)
+                 for model, weight in SOURCES.values()), Value(0.0))
+    active = Q(popularity__gt=0)
+    for model, _ in SOURCES.values():
+        active |= Exists(model.objects.filter(recipe=OuterRef("pk"),
+                                              date_added__gte=since))
+
+    updated = last_id = 0
+    while True:
+        ids = list(Recipe.objects.filter(id__gt=last_id).order_by(
+            "id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return updated
+        last_id = ids[-1]
+        updated += Recipe.objects.filter(
+            active, id__gte=ids[0], id__lte=last_id
+        ).update(popularity=score)
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from users.models import Follow
+from recipes import feed, tasks
+from recipes.models import Recipe, ShoppingCart
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_new_recipe(sender, instance, created, **kwargs):
+    if created:
+        tasks.fan_out_recipe.delay(recipe_id=instance.pk)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def snapshot_cart_item(sender, instance, created, **kwargs):
+    if created:
+        tasks.capture_cart_snapshot.delay(cart_id=instance.pk,
+                                          recipe_id=instance.recipe_id)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_new_follow(sender, instance, created, **kwargs):
+    if created:
+        feed.backfill_follow(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_removed_follow(sender, instance, **kwargs):
+    feed.remove_follow(instance)
@@ -0,0 +1,26 @@
+from jobs.queue import task
+from recipes import feed
+from recipes.models import Recipe, RecipeIngredient, ShoppingCart
+
+
+@task
+def fan_out_recipe(recipe_id):
+    """Раскладывает новый рецепт по лентам подписчиков автора"""
+    recipe = Recipe.objects.only("id", "author_id", "date_created").filter(
+        pk=recipe_id).first()
+    if recipe is not None:
+        feed.fan_out_recipe(recipe)
+
+
+@task
+def capture_cart_snapshot(cart_id, recipe_id):
+    """Сохраняет состав рецепта на момент добавления в корзину"""
+    snapshot = [
+        {"name": name, "unit": unit, "amount": amount}
+        for name, unit, amount in RecipeIngredient.objects.filter(
+            recipe_id=recipe_id
+        ).order_by("id").values_list(
+            "ingredient__name", "ingredient__measurement_unit", "amount")
+    ]
+    ShoppingCart.objects.filter(pk=cart_id).update(
+        ingredients_snapshot=snapshot)
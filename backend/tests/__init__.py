@@ -0,0 +1,12 @@
+# Кэш в памяти, чтобы тесты не видели общий кэш разработки
+TEST_CACHES = {
+    "default": {
+        "BACKEND": "api.cache.TwoTierCache",
+        "LOCATION": "tests",
+        "OPTIONS": {"L2": "shared"},
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "tests",
+    },
+}
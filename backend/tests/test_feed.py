@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes import feed
+from recipes.models import Recipe
+from tests import TEST_CACHES
+from users.models import Follow, User
+
+
+@override_settings(CACHES=TEST_CACHES)
+class FeedTest(TestCase):
+    """Лента листается по FeedEntry и не считает подписки на запрос"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            username="reader", email="reader@example.com", password="secret",
+            first_name="Reader", last_name="Reader")
+        cls.author = User.objects.create_user(
+            username="author", email="author@example.com", password="secret",
+            first_name="Author", last_name="Author")
+        cls.token = Token.objects.create(user=cls.reader)
+        now = timezone.now()
+        cls.recipes = []
+        for number in range(7):
+            recipe = Recipe.objects.create(
+                author=cls.author, title=f"Рецепт {number}",
+                description="Сварить", preparation_time=10,
+                image="recipes/images/soup.png")
+            # Два рецепта с одной датой проверяют сортировку по id
+            Recipe.objects.filter(pk=recipe.pk).update(
+                date_created=now - timedelta(hours=min(number, 5)))
+            cls.recipes.append(recipe)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_following_count_tracks_follows(self):
+        self.reader.refresh_from_db()
+        self.assertEqual(self.reader.following_count, 1)
+        Follow.objects.get(user=self.reader).delete()
+        self.reader.refresh_from_db()
+        self.assertEqual(self.reader.following_count, 0)
+
+    def test_pages_follow_timeline_order(self):
+        expected = list(Recipe.objects.order_by(
+            "-date_created", "-id").values_list("id", flat=True))
+        url = "/api/recipes/feed/?limit=3"
+        seen = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    url, headers={"Authorization": f"Token {self.token.key}"})
+            self.assertEqual(response.status_code, 200)
+            page_sql = [query["sql"] for query in queries
+                        if "recipes_feedentry" in query["sql"]]
+            self.assertEqual(len(page_sql), 1)
+            self.assertNotIn("JOIN", page_sql[0])
+            self.assertFalse(any(
+                "COUNT(" in query["sql"] and "users_follow" in query["sql"]
+                for query in queries))
+            seen += [recipe["id"] for recipe in response.json()["results"]]
+            url = response.json()["next"]
+        self.assertEqual(seen, expected)
+
+    @override_settings(FEED_PULL_THRESHOLD=0)
+    def test_pull_path_above_threshold(self):
+        self.reader.refresh_from_db()
+        entries = list(feed.get_feed_queryset(self.reader).order_by(
+            "-date_created", "-recipe_id"))
+        self.assertEqual(len(entries), len(self.recipes))
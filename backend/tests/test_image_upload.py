@@ -0,0 +1,90 @@
+import base64
+import io
+import os
+import tempfile
+import tracemalloc
+
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from api.serializers import Base64ImageField
+from tests import TEST_CACHES
+from users.models import User
+
+
+URL = "/api/users/me/avatar/"
+
+
+def data_url(image):
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return ("data:image/png;base64,"
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+def noise(size):
+    """PNG со случайным шумом почти не сжимается"""
+    return data_url(Image.frombytes("RGB", (size, size),
+                                    os.urandom(size * size * 3)))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ImageUploadTest(TestCase):
+    """Изображения из data URL декодируются кусками и проверяются"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="cook", email="cook@example.com", password="secret",
+            first_name="Cook", last_name="Cook")
+        cls.large = noise(1500)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(MEDIA_ROOT=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        token = Token.objects.create(user=self.user)
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Token {token.key}"
+
+    def upload(self, avatar):
+        return self.client.put(URL, {"avatar": avatar},
+                               content_type="application/json")
+
+    def test_large_data_url_peak_memory(self):
+        field = Base64ImageField(resize_to=256)
+        tracemalloc.start()
+        try:
+            upload = field.to_internal_value(self.large)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        upload.close()
+        # Декодированный файл (около 6,7 МБ) целиком в памяти не держится
+        self.assertGreater(len(self.large), 8 * 1024 * 1024)
+        self.assertLess(peak, 2 * 1024 * 1024)
+
+    def test_large_avatar_upload(self):
+        response = self.upload(self.large)
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        with Image.open(self.user.avatar) as image:
+            self.assertEqual(image.size, (256, 256))
+
+    def test_decompression_bomb(self):
+        # Пустой PNG сжимается до десятков килобайт
+        bomb = data_url(Image.new("L", (5000, 5000)))
+        self.assertLess(len(bomb), 100 * 1024)
+        response = self.upload(bomb)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"],
+                         "Изображение слишком большое: 5000x5000")
+
+    @override_settings(IMAGE_MAX_UPLOAD_SIZE=1024 * 1024)
+    def test_oversized_payload(self):
+        response = self.upload(self.large)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"],
+                         "Файл изображения слишком большой")
@@ -0,0 +1,39 @@
+from django.test import TestCase, override_settings
+
+from tests import TEST_CACHES
+from users.models import User
+
+
+@override_settings(CACHES=TEST_CACHES, METRICS_TOKEN="secret-token",
+                   METRICS_ALLOWED_NETWORKS="10.0.0.0/8")
+class MetricsAccessTest(TestCase):
+    """/metrics закрыт без токена, разрешённой сети или staff"""
+
+    def test_anonymous_is_forbidden(self):
+        response = self.client.get("/metrics", REMOTE_ADDR="203.0.113.5")
+        self.assertEqual(response.status_code, 403)
+
+    def test_wrong_token_is_forbidden(self):
+        response = self.client.get(
+            "/metrics", REMOTE_ADDR="203.0.113.5",
+            headers={"Authorization": "Bearer wrong"})
+        self.assertEqual(response.status_code, 403)
+
+    def test_token(self):
+        response = self.client.get(
+            "/metrics", REMOTE_ADDR="203.0.113.5",
+            headers={"Authorization": "Bearer secret-token"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"http_request", response.content)
+
+    def test_allowed_network(self):
+        response = self.client.get("/metrics", REMOTE_ADDR="10.1.2.3")
+        self.assertEqual(response.status_code, 200)
+
+    def test_staff_session(self):
+        admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="secret",
+            first_name="Admin", last_name="Admin", is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.get("/metrics", REMOTE_ADDR="203.0.113.5")
+        self.assertEqual(response.status_code, 200)
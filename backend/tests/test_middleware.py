@@ -0,0 +1,38 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+
+from recipes.models import Recipe, ShoppingCart
+from tests import TEST_CACHES
+from users.models import User
+
+
+@override_settings(ROOT_URLCONF="tests.urls", CACHES=TEST_CACHES)
+class AsyncMiddlewareStackTest(TestCase):
+    """Асинхронное представление проходит всю цепочку без адаптации"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="cook", email="cook@example.com", password="secret",
+            first_name="Cook", last_name="Cook")
+        recipe = Recipe.objects.create(
+            author=cls.user, title="Суп", description="Сварить",
+            preparation_time=10,
+            image="recipes/images/soup.png")
+        ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    async def test_view_runs_in_request_task(self):
+        # Синхронное звено цепочки запустило бы представление в новой
+        # задаче через async_to_sync
+        response = await self.async_client.get("/api/probe/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIs(response.asgi_request.probe_task,
+                      asyncio.current_task())
+
+    async def test_async_recipe_list(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get("/api/async/recipes/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cart-Count"], "1")
@@ -0,0 +1,59 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from tests import TEST_CACHES
+from users.models import User
+
+
+@override_settings(PROFILING_SAMPLE_RATE=0, CACHES=TEST_CACHES)
+class ProfilingMiddlewareTest(TestCase):
+    """Профиль по запросу пишется только для staff"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="secret",
+            first_name="Admin", last_name="Admin", is_staff=True)
+        cls.user = User.objects.create_user(
+            username="cook", email="cook@example.com", password="secret",
+            first_name="Cook", last_name="Cook")
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(PROFILING_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def get(self, **kwargs):
+        with mock.patch("api.middleware.cProfile.Profile") as profile:
+            response = self.client.get("/api/ingredients/?profile=1",
+                                       **kwargs)
+        return response, profile
+
+    def test_anonymous_request_is_not_profiled(self):
+        response, profile = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response)
+        profile.assert_not_called()
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_regular_user_is_not_profiled(self):
+        token = Token.objects.create(user=self.user)
+        response, profile = self.get(
+            headers={"Authorization": f"Token {token.key}"})
+        self.assertNotIn("X-Profile-Id", response)
+        profile.assert_not_called()
+
+    def test_staff_token_is_profiled(self):
+        token = Token.objects.create(user=self.admin)
+        response = self.client.get(
+            "/api/ingredients/", headers={
+                "Authorization": f"Token {token.key}", "X-Profile": "1"})
+        profile_id = response["X-Profile-Id"]
+        self.assertTrue((self.directory / f"{profile_id}.prof").exists())
@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from api.cache import cache_stats
+from api.timing import start_timing, stop_timing
+from recipes.models import Recipe, ShortLink
+from tests import TEST_CACHES
+from users.models import User
+
+
+@override_settings(ROOT_URLCONF="tests.urls", CACHES=TEST_CACHES,
+                   SERVER_TIMING_SAMPLE_RATE=0)
+class ServerTimingTest(TestCase):
+    """Server-Timing ставит middleware для всех ответов API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="secret",
+            first_name="Admin", last_name="Admin", is_staff=True)
+        cls.token = Token.objects.create(user=cls.admin)
+        recipe = Recipe.objects.create(
+            author=cls.admin, title="Суп", description="Сварить",
+            preparation_time=10, image="recipes/images/soup.png")
+        ShortLink.objects.create(recipe=recipe, code="abc123")
+
+    def phases(self, response):
+        return [part.split(";")[0]
+                for part in response["Server-Timing"].split(", ")]
+
+    def test_anonymous_response_has_no_header(self):
+        response = self.client.get("/api/ingredients/")
+        self.assertNotIn("Server-Timing", response)
+
+    def headers(self):
+        return {"Authorization": f"Token {self.token.key}",
+                "X-Server-Timing": "1"}
+
+    def test_not_requested_is_not_measured(self):
+        with mock.patch("api.middleware.start_timing") as start:
+            response = self.client.get(
+                "/api/recipes/",
+                headers={"Authorization": f"Token {self.token.key}"})
+        self.assertNotIn("Server-Timing", response)
+        start.assert_not_called()
+
+    def test_requested_by_non_staff(self):
+        user = User.objects.create_user(
+            username="user", email="user@example.com", password="secret",
+            first_name="User", last_name="User")
+        token = Token.objects.create(user=user)
+        response = self.client.get(
+            "/api/recipes/",
+            headers={"Authorization": f"Token {token.key}",
+                     "X-Server-Timing": "1"})
+        self.assertNotIn("Server-Timing", response)
+
+    def test_viewset_phases(self):
+        response = self.client.get("/api/recipes/", headers=self.headers())
+        self.assertEqual(self.phases(response), [
+            "db", "cache", "auth", "serialize", "render", "total"])
+
+    def test_short_link(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(
+            "/s/abc123", headers={"X-Server-Timing": "1"})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.phases(response), ["db", "cache", "total"])
+
+    async def test_async_view_with_token(self):
+        response = await self.async_client.get(
+            "/api/async/recipes/", headers=self.headers())
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Server-Timing", response)
+
+    def test_l1_hits_are_timed(self):
+        cache.set("timing", 1)
+        hits = cache_stats()["l1_hits"]
+        timing, token = start_timing(None)
+        try:
+            self.assertEqual(cache.get("timing"), 1)
+        finally:
+            stop_timing(token)
+        self.assertGreater(timing.cache, 0)
+        self.assertEqual(cache_stats()["l1_hits"], hits + 1)
@@ -0,0 +1,59 @@
+import tempfile
+
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from api.tasks import render_shopping_list
+from jobs.models import Job
+from recipes.models import Ingredient, Recipe, RecipeIngredient, ShoppingCart
+from tests import TEST_CACHES
+from users.models import User
+
+
+URL = "/api/recipes/download_shopping_cart/?type=pdf"
+
+
+@override_settings(CACHES=TEST_CACHES, JOBS_EAGER=False)
+class ShoppingListPdfTest(TestCase):
+    """PDF списка покупок рисуется в фоне, запрос его не ждёт"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="cook", email="cook@example.com", password="secret",
+            first_name="Cook", last_name="Cook")
+        recipe = Recipe.objects.create(
+            author=cls.user, title="Суп", description="Сварить",
+            preparation_time=10, image="recipes/images/soup.png")
+        salt = Ingredient.objects.create(name="соль", measurement_unit="г")
+        RecipeIngredient.objects.create(recipe=recipe, ingredient=salt,
+                                        amount=5)
+        ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(SHOPPING_LIST_CACHE_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        token = Token.objects.create(user=self.user)
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Token {token.key}"
+
+    def test_miss_queues_render(self):
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response["Location"], URL)
+        jobs = Job.objects.filter(name=render_shopping_list.name,
+                                  payload={"user_id": self.user.pk})
+        self.assertEqual(jobs.count(), 1)
+
+        self.client.get(URL)
+        self.assertEqual(jobs.count(), 1)
+
+        render_shopping_list(user_id=self.user.pk)
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        response = self.client.get(URL,
+                                   headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,19 @@
+import asyncio
+
+from django.http import JsonResponse
+from django.urls import path
+
+from api import async_views
+from foodgram.urls import urlpatterns as project_urlpatterns
+
+
+async def probe(request):
+    """Запоминает задачу asyncio, в которой выполнилось представление"""
+    request.probe_task = asyncio.current_task()
+    return JsonResponse({"ok": True})
+
+
+urlpatterns = [
+    path("api/probe/", probe),
+    path("api/async/recipes/", async_views.recipe_list_view),
+] + project_urlpatterns
@@ -1,14 +1,17 @@
 from django.contrib import admin
+from api.admin import LargeTableAdmin
 from .models import User, Follow
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(LargeTableAdmin):
     list_display = ["email", "username", "first_name", "last_name", "is_staff"]
     search_fields = ["email", "username"]
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = ["user", "author"]
+    list_select_related = ["user", "author"]
     search_fields = ["user__email", "author__email"]
+    autocomplete_fields = ["user", "author"]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:41
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="follow",
+            options={"verbose_name": "Подписка", "verbose_name_plural": "Подписки"},
+        ),
+        migrations.AlterModelOptions(
+            name="user",
+            options={
+                "ordering": ["username"],
+                "verbose_name": "Пользователь",
+                "verbose_name_plural": "Пользователи",
+            },
+        ),
+        migrations.AlterField(
+            model_name="follow",
+            name="author",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="followers",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="follow",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="following",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="user",
+            name="username",
+            field=models.CharField(
+                max_length=150,
+                unique=True,
+                validators=[
+                    django.core.validators.RegexValidator(regex="^[\\w.@+-]+\\Z")
+                ],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="follow",
+            index=models.Index(
+                fields=["author", "user"], name="follow_author_user_idx"
+            ),
+        ),
+    ]
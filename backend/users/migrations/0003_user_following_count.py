@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-19 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_index_audit"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="following_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Число подписок"
+            ),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE users_user AS account
+            SET following_count = (
+                SELECT COUNT(*) FROM users_follow WHERE user_id = account.id
+            )
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -30,6 +30,9 @@ class User(AbstractUser):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     date_joined = models.DateTimeField(auto_now_add=True)
+    # Ведётся сигналами Follow: по нему лента выбирает способ сборки
+    following_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Число подписок")
 
     objects = CustomUserManager()
 
@@ -48,16 +51,21 @@ class User(AbstractUser):
 class Follow(models.Model):
     user = models.ForeignKey(User,
                              on_delete=models.CASCADE,
-                             related_name="following")
+                             related_name="following",
+                             db_index=False)
     author = models.ForeignKey(User,
                                on_delete=models.CASCADE,
-                               related_name="followers")
+                               related_name="followers",
+                               db_index=False)
 
     class Meta:
         unique_together = ("user", "author")
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
-        ordering = ['user']
+        indexes = [
+            models.Index(fields=["author", "user"],
+                         name="follow_author_user_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} follows {self.author}"